@@ -0,0 +1,11 @@
+import pytest
+from django.test.utils import override_settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def metrics_dir(tmp_path_factory):
+    """Метрики тестовых запросов пишутся во временный каталог,
+    как и в core.runner.TestRunner для manage.py test."""
+    directory = tmp_path_factory.mktemp('metrics')
+    with override_settings(METRICS_DIR=str(directory)):
+        yield directory
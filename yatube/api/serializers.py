@@ -0,0 +1,93 @@
+"""Посты в JSON без сторонних библиотек.
+
+Клиент выбирает поля параметром fields=, и из базы читаются только
+нужные для них столбцы. Автор и группа приходят тем же запросом через
+select_related. Ответ отдается по частям: по посту за раз.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Post
+
+# Поле ответа -> столбцы, без которых его не построить. pk и pub_date
+# читаются всегда: из них строится курсор.
+COLUMNS = {
+    'id': (),
+    'text': ('text',),
+    'pub_date': (),
+    'image': ('image',),
+    'comments_count': ('comments_count',),
+    'author': (
+        'author', 'author__username', 'author__first_name',
+        'author__last_name'),
+    'group': ('group', 'group__slug', 'group__title'),
+}
+RELATED = ('author', 'group')
+
+encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+def parse_fields(value):
+    """Поля из параметра fields=; ValueError для неизвестных полей."""
+    if not value:
+        return tuple(COLUMNS)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in COLUMNS]
+    if unknown or not fields:
+        raise ValueError(', '.join(unknown))
+    return fields
+
+
+def posts_for(fields):
+    """Queryset постов только со столбцами выбранных полей."""
+    posts = Post.objects.all()
+    related = [name for name in RELATED if name in fields]
+    if related:
+        posts = posts.select_related(*related)
+    return posts.only(
+        'pub_date', *(column for name in fields for column in COLUMNS[name]))
+
+
+def _author(post):
+    author = post.author
+    return {
+        'id': author.pk,
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+    }
+
+
+def _group(post):
+    if post.group_id is None:
+        return None
+    return {
+        'id': post.group_id,
+        'slug': post.group.slug,
+        'title': post.group.title,
+    }
+
+
+VALUES = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+    'author': _author,
+    'group': _group,
+}
+
+
+def serialize(post, fields):
+    return {name: VALUES[name](post) for name in fields}
+
+
+def stream_page(page, fields, links):
+    """Части JSON страницы: {"results": [...], "next": ..., ...}."""
+    yield '{"results": ['
+    for number, post in enumerate(page):
+        yield (', ' if number else '') + encoder.encode(
+            serialize(post, fields))
+    yield '], '
+    yield encoder.encode(links)[1:]
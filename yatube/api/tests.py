@@ -0,0 +1,132 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='TestApiAuthor', first_name='Лев', last_name='Толстой')
+        cls.other = User.objects.create(username='TestApiOther')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-api', description='Группа')
+        for number in range(3):
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group)
+            Post.objects.create(text=f'Чужой пост {number}', author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def test_feeds_stream_json(self):
+        """Ленты отдаются потоком JSON с автором и группой."""
+        urls = {
+            reverse('api:index'): 6,
+            reverse('api:group_posts', args=['test-api']): 3,
+            reverse('api:profile', args=['TestApiOther']): 3,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                response, data = self.get(url)
+                self.assertTrue(response.streaming)
+                self.assertEqual(
+                    response['Content-Type'],
+                    'application/json; charset=utf-8')
+                self.assertEqual(len(data['results']), count)
+        _, data = self.get(reverse('api:group_posts', args=['test-api']))
+        post = data['results'][0]
+        self.assertEqual(post['text'], 'Пост 2')
+        self.assertEqual(post['author'], {
+            'id': self.author.pk, 'username': 'TestApiAuthor',
+            'first_name': 'Лев', 'last_name': 'Толстой'})
+        self.assertEqual(post['group'], {
+            'id': self.group.pk, 'slug': 'test-api',
+            'title': 'Тестовая группа'})
+
+    @override_settings(AMOUNT_POSTS=4)
+    def test_cursor_pagination(self):
+        """Страницы листаются курсором, ссылки сохраняют fields=."""
+        response, first = self.get(reverse('api:index'), fields='id')
+        self.assertIn('fields=id', first['next'])
+        self.assertIsNone(first['previous'])
+        _, second = self.get(first['next'])
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertCountEqual(ids, Post.objects.values_list('pk', flat=True))
+        _, back = self.get(second['previous'])
+        self.assertEqual(back['results'], first['results'])
+
+    def test_fields_limit_columns(self):
+        """fields= ограничивает и ответ, и столбцы запроса."""
+        with CaptureQueriesContext(connection) as queries:
+            _, data = self.get(reverse('api:index'), fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('posts_group', sql)
+        self.assertNotIn('"renditions"', sql)
+
+    def test_unknown_field_rejected(self):
+        """Неизвестное поле в fields= дает 400 без ETag."""
+        response = self.client.get(reverse('api:index'), {'fields': 'secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {'detail': 'Неизвестные поля: secret'})
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_no_queries_per_post(self):
+        """Автор и группа приходят тем же запросом, что и посты."""
+        for number in range(5):
+            Post.objects.create(
+                text=f'Еще пост {number}', author=self.other,
+                group=self.group)
+        # Группа, версии лент для ETag и посты.
+        with self.assertNumQueries(3):
+            self.get(reverse('api:group_posts', args=['test-api']))
+
+    def test_etag_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока лента не изменилась."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_and_anonymous_follow(self):
+        """Несуществующие группа и автор дают 404, гостю лента — 401."""
+        urls = {
+            reverse('api:group_posts', args=['missing']): 404,
+            reverse('api:profile', args=['missing']): 404,
+            reverse('api:follow_index'): 401,
+        }
+        for url, status in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
+
+    def test_follow_feed(self):
+        """Лента подписок отдает посты авторов, на которых подписан."""
+        reader = User.objects.create(username='TestApiReader')
+        self.client.force_login(reader)
+        self.client.get(reverse(
+            'posts:profile_follow', args=['TestApiOther']))
+        self.assertTrue(Follow.objects.filter(user=reader).exists())
+        _, data = self.get(reverse('api:follow_index'), fields='text')
+        self.assertEqual(
+            [post['text'] for post in data['results']],
+            ['Чужой пост 2', 'Чужой пост 1', 'Чужой пост 0'])
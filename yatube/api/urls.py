@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.index, name='index'),
+    path('groups/<slug:slug>/posts/', views.group_posts, name='group_posts'),
+    path('users/<str:username>/posts/', views.profile, name='profile'),
+    path('follow/posts/', views.follow_index, name='follow_index'),
+]
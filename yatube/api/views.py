@@ -0,0 +1,126 @@
+from functools import wraps
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
+
+from posts.cache import (INDEX, PULLED, feed_etag, follow_feed, group_feed,
+                         page_feeds, profile_feed)
+from posts.feed import follow_paginator
+from posts.models import Group, User
+from posts.utils import AFTER, BEFORE, cursor_paginated, paginate, paginator
+
+from .serializers import parse_fields, posts_for, stream_page
+
+
+def _error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _valid_fields(feeds):
+    """Ответ с ошибкой в fields= не получает ETag."""
+    @wraps(feeds)
+    def wrapper(request, *args, **kwargs):
+        try:
+            parse_fields(request.GET.get('fields'))
+        except ValueError:
+            return None
+        return feeds(request, *args, **kwargs)
+    return wrapper
+
+
+@_valid_fields
+def _index_feeds(request):
+    return [INDEX]
+
+
+@_valid_fields
+def _group_feeds(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    return None if group_id is None else [group_feed(group_id)]
+
+
+@_valid_fields
+def _profile_feeds(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    return None if author_id is None else [profile_feed(author_id)]
+
+
+@_valid_fields
+def _follow_feeds(request):
+    if not request.user.is_authenticated:
+        return None
+    return [follow_feed(request.user.pk), PULLED]
+
+
+def _link(request, direction, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop(AFTER, None)
+    params.pop(BEFORE, None)
+    params[direction] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def _page_response(request, page, fields):
+    links = {
+        'next': _link(request, AFTER, page.next_cursor),
+        'previous': _link(request, BEFORE, page.previous_cursor),
+    }
+    return StreamingHttpResponse(
+        stream_page(page, fields, links),
+        content_type='application/json; charset=utf-8')
+
+
+def api_feed(feeds):
+    """Лента в JSON: GET, поля из fields=, ETag из версий лент.
+
+    Представление получает запрос, выбранные поля и параметры адреса
+    и возвращает страницу постов или готовый ответ с ошибкой.
+    """
+    def decorator(view):
+        @condition(etag_func=feed_etag(feeds))
+        @require_safe
+        @cursor_paginated
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                fields = parse_fields(request.GET.get('fields'))
+            except ValueError as unknown:
+                return _error(400, f'Неизвестные поля: {unknown}')
+            page = view(request, fields, *args, **kwargs)
+            if isinstance(page, JsonResponse):
+                return page
+            return _page_response(request, page, fields)
+        return wrapper
+    return decorator
+
+
+@api_feed(_index_feeds)
+def index(request, fields):
+    return paginator(request, posts_for(fields))
+
+
+@api_feed(_group_feeds)
+def group_posts(request, fields, slug):
+    if page_feeds(_group_feeds, request, slug) is None:
+        return _error(404, 'Группа не найдена.')
+    return paginator(request, posts_for(fields).filter(group__slug=slug))
+
+
+@api_feed(_profile_feeds)
+def profile(request, fields, username):
+    if page_feeds(_profile_feeds, request, username) is None:
+        return _error(404, 'Пользователь не найден.')
+    return paginator(
+        request, posts_for(fields).filter(author__username=username))
+
+
+@api_feed(_follow_feeds)
+def follow_index(request, fields):
+    if not request.user.is_authenticated:
+        return _error(401, 'Нужно войти.')
+    return paginate(
+        request, follow_paginator(request.user, posts_for(fields)))
@@ -0,0 +1,194 @@
+"""ASGI-вход поверх WSGI-приложения.
+
+Django 2.2 не умеет ASGI, поэтому приложение целиком выполняется
+в ограниченном пуле потоков ASGI_THREADS: представление, ORM, обход
+тела ответа и его закрытие (сигнал request_finished) идут в потоке,
+и соединение с базой у потока свое. Цикл событий сам принимает тело
+запроса и отдает готовый ответ, поэтому медленный клиент не занимает
+поток пула.
+
+Потоковый ответ (события SSE, FileResponse из serve_static и раздачи
+медиа) отдается по частям, с ожиданием клиента, и держит поток все
+время отдачи: медленный клиент скачивает большой файл — поток занят.
+Такие ответы обходятся и закрываются в отдельном пуле
+ASGI_STREAM_THREADS, чтобы открытые потоки не останавливали обычные
+страницы; сверх его размера потоковые ответы ждут очереди.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+def _latin1(value):
+    return value.encode().decode('latin-1')
+
+
+def environ(scope, body):
+    """WSGI environ для HTTP-соединения ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    path = scope.get('raw_path') or scope['path'].encode()
+    root = scope.get('root_path', '')
+    result = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(root),
+        'PATH_INFO': path.decode('latin-1')[len(_latin1(root)):],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin-1')
+        if name in result:
+            value = f'{result[name]},{value}'
+        result[name] = value
+    return result
+
+
+class ClientDisconnected(OSError):
+    """Клиент закрыл соединение, не дождавшись конца ответа."""
+
+
+def _start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ],
+    }
+
+
+class ASGIHandler:
+    """ASGI-приложение, которое вызывает WSGI-приложение в пуле потоков."""
+
+    def __init__(self, application):
+        self.application = application
+        self.pool = self.stream_pool = None
+
+    def pools(self):
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(
+                max_workers=settings.ASGI_THREADS,
+                thread_name_prefix='asgi')
+            self.stream_pool = ThreadPoolExecutor(
+                max_workers=settings.ASGI_STREAM_THREADS,
+                thread_name_prefix='asgi-stream')
+        return self.pool, self.stream_pool
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемое соединение: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        with body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            disconnected = threading.Event()
+            watcher = asyncio.ensure_future(
+                self.watch(receive, disconnected))
+            loop = asyncio.get_running_loop()
+
+            def send_from_thread(message):
+                if disconnected.is_set():
+                    raise ClientDisconnected
+                asyncio.run_coroutine_threadsafe(
+                    send(message), loop).result()
+
+            pool, stream_pool = self.pools()
+            try:
+                start, result = await loop.run_in_executor(
+                    pool, self.run, environ(scope, body))
+                if getattr(result, 'streaming', False):
+                    await loop.run_in_executor(
+                        stream_pool, self.stream, result, start,
+                        send_from_thread)
+                    return
+            finally:
+                watcher.cancel()
+        await send(start)
+        await send({'type': 'http.response.body', 'body': b''.join(result)})
+
+    async def watch(self, receive, disconnected):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    def run(self, environ):
+        """Выполняет запрос в потоке пула.
+
+        Обычный ответ возвращается целиком, как пара (начало, части
+        тела). Потоковый ответ возвращается необойденным, его отдает
+        и закрывает stream в пуле потоковых ответов.
+        """
+        started, chunks = [], []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [_start_message(status, headers)]
+            return chunks.append
+
+        result = self.application(environ, start_response)
+        if getattr(result, 'streaming', False):
+            return started[0], result
+        try:
+            chunks.extend(result)
+            return started[0], chunks
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    def stream(self, result, start, send):
+        try:
+            send(start)
+            for chunk in result:
+                if chunk:
+                    send({
+                        'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+            send({'type': 'http.response.body', 'body': b''})
+        except OSError:
+            # Клиент ушел, не дождавшись конца потока: ошибка send
+            # сервера или ClientDisconnected.
+            pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
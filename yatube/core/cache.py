@@ -0,0 +1,22 @@
+"""Кеши, которые сообщают о попаданиях и промахах в core.instrumentation."""
+from django.core.cache.backends import locmem
+
+from .instrumentation import record_cache
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Учитывает попадания в get; get_many у LocMemCache сводится к get."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            record_cache(0, 1)
+            return default
+        record_cache(1, 0)
+        return value
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
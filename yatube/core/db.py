@@ -0,0 +1,23 @@
+"""Настройка соединений SQLite.
+
+PRAGMA применяются к каждому новому соединению: WAL позволяет читателям
+не ждать пишущую транзакцию, synchronous=NORMAL в режиме WAL безопасен
+и не делает fsync на каждый коммит, mmap и увеличенный кеш страниц
+уменьшают число системных вызовов при чтении, busy_timeout заставляет
+писателей подождать блокировку вместо немедленной ошибки.
+"""
+from django.conf import settings
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Обработчик connection_created для баз SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
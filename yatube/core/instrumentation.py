@@ -0,0 +1,95 @@
+"""Счетчики запросов к базе, рендеринга шаблонов и обращений к кешу."""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.template import base
+
+_local = threading.local()
+_installed = False
+
+
+class QueryTimer:
+    """Обертка для connection.execute_wrapper: число и время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+class TemplateTimer:
+    def __init__(self):
+        self.time = 0.0
+
+
+def _install():
+    """Один раз оборачивает Template.render.
+
+    Учитывается только внешний вызов: вложенные include и extends
+    уже входят в его время.
+    """
+    global _installed
+    if _installed:
+        return
+    render = base.Template.render
+
+    def timed_render(self, context):
+        timers = getattr(_local, 'timers', ())
+        if not timers or getattr(_local, 'depth', 0):
+            return render(self, context)
+        _local.depth = 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            for timer in timers:
+                timer.time += elapsed
+            _local.depth = 0
+
+    base.Template.render = timed_render
+    _installed = True
+
+
+@contextmanager
+def _active(name, meter):
+    """Добавляет счетчик к действующим в потоке; вложенные замеры
+    (middleware внутри бенчмарка) видят одни и те же события."""
+    meters = getattr(_local, name, ())
+    setattr(_local, name, (*meters, meter))
+    try:
+        yield meter
+    finally:
+        setattr(_local, name, meters)
+
+
+def template_timer():
+    """Суммирует время рендеринга шаблонов в текущем потоке."""
+    _install()
+    return _active('timers', TemplateTimer())
+
+
+class CacheCounter:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+
+def record_cache(hits, misses):
+    """Вызывается кешем: учитывает попадания в текущем замере, если он идет."""
+    for counter in getattr(_local, 'counters', ()):
+        counter.hits += hits
+        counter.misses += misses
+
+
+def cache_counter():
+    """Считает попадания и промахи кеша в текущем потоке."""
+    return _active('counters', CacheCounter())
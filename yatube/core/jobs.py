@@ -0,0 +1,133 @@
+"""Очередь фоновых задач в таблице core_job.
+
+Функция с декоратором @job ставится в очередь вызовом .delay(...):
+в той же транзакции, что и запрос, добавляется строка Job с именем
+функции и аргументами в JSON. Воркеры (manage.py run_workers) забирают
+задачи атомарным UPDATE: строку получает тот, чей UPDATE первым
+сменил ее статус, поэтому блокировки строк не нужны и на SQLite.
+Упавшая задача повторяется через JOBS_BACKOFF * 2^(попытка - 1)
+секунд, после max_attempts попыток остается в статусе failed.
+Задача, воркер которой пропал, через JOBS_LOCK_TIMEOUT секунд
+достается другому воркеру, а если попытки кончились — становится failed.
+
+При JOBS_RUN_INLINE задачи выполняются сразу после коммита, в том
+же потоке (для тестов и разработки).
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job(function=None, *, priority=0, max_attempts=3):
+    """Делает функцию задачей очереди: function.delay(*args, **kwargs).
+
+    Аргументы должны сериализоваться в JSON. Чем больше priority,
+    тем раньше задача берется в работу.
+    """
+    def decorator(function):
+        name = f'{function.__module__}.{function.__qualname__}'
+        registry[name] = function
+
+        @wraps(function)
+        def delay(*args, **kwargs):
+            if settings.JOBS_RUN_INLINE:
+                # Через JSON, как в очереди: несериализуемый аргумент
+                # должен падать и здесь.
+                payload = json.loads(json.dumps([args, kwargs]))
+                transaction.on_commit(
+                    lambda: _call(name, function, *payload))
+                return None
+            return Job.objects.create(
+                name=name,
+                payload=json.dumps([args, kwargs]),
+                priority=priority,
+                max_attempts=max_attempts)
+
+        function.delay = delay
+        function.job_name = name
+        return function
+    return decorator(function) if function else decorator
+
+
+def _call(name, function, args, kwargs):
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        logger.exception('Задача %s не выполнена', name)
+
+
+def _abandoned(now):
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Q(status=Job.RUNNING, locked_at__lt=stale)
+
+
+def _claimable(now):
+    return Q(status=Job.QUEUED, run_at__lte=now) | (
+        _abandoned(now) & Q(attempts__lt=F('max_attempts')))
+
+
+def claim(worker):
+    """Забирает самую приоритетную готовую задачу или возвращает None."""
+    # Брошенная задача, исчерпавшая попытки, больше не запускается.
+    Job.objects.filter(
+        _abandoned(timezone.now()), attempts__gte=F('max_attempts')
+    ).update(
+        status=Job.FAILED, locked_by='', locked_at=None,
+        last_error='Воркер пропал, не завершив последнюю попытку.')
+    while True:
+        now = timezone.now()
+        candidate = Job.objects.filter(_claimable(now)).order_by(
+            '-priority', 'run_at', 'pk').values_list('pk', flat=True)[:1]
+        candidate = list(candidate)
+        if not candidate:
+            return None
+        token = f'{worker}:{uuid.uuid4().hex}'
+        claimed = Job.objects.filter(
+            _claimable(now), pk=candidate[0]
+        ).update(
+            status=Job.RUNNING, locked_by=token, locked_at=now,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=candidate[0], locked_by=token)
+        # Задачу перехватил другой воркер: берем следующую.
+
+
+def backoff(attempts):
+    return timedelta(
+        seconds=settings.JOBS_BACKOFF * 2 ** (attempts - 1))
+
+
+def run(task):
+    """Выполняет задачу; удаляет ее при успехе, иначе откладывает."""
+    mine = Job.objects.filter(pk=task.pk, locked_by=task.locked_by)
+    try:
+        function = registry.get(task.name) or import_string(task.name)
+        args, kwargs = json.loads(task.payload)
+        function(*args, **kwargs)
+    except Exception:
+        logger.exception('Задача %s #%s не выполнена', task.name, task.pk)
+        failed = task.attempts >= task.max_attempts
+        mine.update(
+            status=Job.FAILED if failed else Job.QUEUED,
+            run_at=timezone.now() + backoff(task.attempts),
+            locked_by='',
+            locked_at=None,
+            last_error=traceback.format_exc())
+        return False
+    mine.delete()
+    return True
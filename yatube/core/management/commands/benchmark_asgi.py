@@ -0,0 +1,127 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, environ
+
+
+def scope(path):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'server': ('testserver', 80),
+    }
+
+
+def summary(latencies, seconds):
+    ordered = sorted(latencies)
+    return {
+        'rps': len(ordered) / seconds,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[int(len(ordered) * 0.95)] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI-приложения и ASGI-входа '
+        'yatube.asgi при большом числе одновременных запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument(
+            '--paths', nargs='+',
+            help='Адреса страниц (по умолчанию — главная)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Нужны хотя бы один запрос и один клиент.')
+        paths = options['paths'] or [reverse('posts:index')]
+        scopes = [
+            scope(paths[number % len(paths)])
+            for number in range(options['requests'])
+        ]
+        application = get_wsgi_application()
+        # Прогрев: кеш страниц и соединения не должны достаться
+        # только второму прогону.
+        self.run_wsgi(application, [scope(path) for path in paths], 1)
+        results = {
+            'wsgi': self.run_wsgi(
+                application, scopes, options['concurrency']),
+            'asgi': asyncio.run(self.run_asgi(
+                ASGIHandler(application), scopes, options['concurrency'])),
+        }
+        for name, stats in results.items():
+            self.stdout.write(
+                '{}: запросов/с {rps:.0f}, p50 {p50_ms:.1f} мс, '
+                'p95 {p95_ms:.1f} мс'.format(name, **stats))
+        self.stdout.write(
+            f'одновременных клиентов {options["concurrency"]}, '
+            f'потоков ASGI {settings.ASGI_THREADS}, '
+            'ASGI/WSGI: x{:.2f}'.format(
+                results['asgi']['rps'] / results['wsgi']['rps']))
+
+    def run_wsgi(self, application, scopes, concurrency):
+        def request(scope):
+            statuses = []
+            start = time.perf_counter()
+            result = application(
+                environ(scope, io.BytesIO()),
+                lambda status, headers, exc_info=None: statuses.append(
+                    status))
+            try:
+                b''.join(result)
+            finally:
+                result.close()
+            self.check_status(int(statuses[0].split()[0]), scope)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(request, scopes))
+        return summary(latencies, time.perf_counter() - start)
+
+    async def run_asgi(self, application, scopes, concurrency):
+        clients = asyncio.Semaphore(concurrency)
+
+        async def request(scope):
+            messages = [{'type': 'http.request', 'body': b''}]
+            sent = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # Клиент не уходит, пока не получит ответ.
+                return await asyncio.get_running_loop().create_future()
+
+            async def send(message):
+                sent.append(message)
+
+            async with clients:
+                start = time.perf_counter()
+                await application(scope, receive, send)
+                elapsed = time.perf_counter() - start
+            self.check_status(sent[0]['status'], scope)
+            return elapsed
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*map(request, scopes))
+        return summary(latencies, time.perf_counter() - start)
+
+    def check_status(self, status, scope):
+        if status >= 400:
+            raise CommandError(f'{scope["path"]}: ответ {status}')
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, pub_date REAL NOT NULL, text TEXT NOT NULL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+)
+
+
+def read(connection):
+    connection.execute(
+        'SELECT id, pub_date, text FROM post ORDER BY pub_date DESC LIMIT 10'
+    ).fetchall()
+
+
+def write(connection):
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(
+            'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+            (time.time(), 'x' * 200))
+        connection.execute('COMMIT')
+    except sqlite3.OperationalError:
+        connection.execute('ROLLBACK')
+        raise
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками по '
+        'умолчанию и с SQLITE_PRAGMAS при конкурентных чтениях и записях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        modes = {
+            'default': {},
+            'tuned': getattr(settings, 'SQLITE_PRAGMAS', {}),
+        }
+        results = {}
+        for name, pragmas in modes.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.prepare(path, pragmas, options['rows'])
+                results[name] = self.run(path, pragmas, options)
+            self.stdout.write(
+                f'{name}: чтений/с {results[name]["reads"]:.0f}, '
+                f'записей/с {results[name]["writes"]:.0f}, '
+                f'ошибок блокировки {results[name]["busy"]}'
+            )
+        if results['default']['reads']:
+            self.stdout.write('прирост чтений: x{:.2f}'.format(
+                results['tuned']['reads'] / results['default']['reads']))
+        if results['default']['writes']:
+            self.stdout.write('прирост записей: x{:.2f}'.format(
+                results['tuned']['writes'] / results['default']['writes']))
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        return connection
+
+    def prepare(self, path, pragmas, rows):
+        connection = self.connect(path, pragmas)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+            ((now - i, 'x' * 200) for i in range(rows)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, pragmas, options):
+        counters = {'reads': 0, 'writes': 0, 'busy': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def worker(operation, counter):
+            connection = self.connect(path, pragmas)
+            done = busy = 0
+            while time.monotonic() < deadline:
+                try:
+                    operation(connection)
+                    done += 1
+                except sqlite3.OperationalError:
+                    busy += 1
+            connection.close()
+            with lock:
+                counters[counter] += done
+                counters['busy'] += busy
+
+        threads = [
+            threading.Thread(target=worker, args=(read, 'reads'))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=worker, args=(write, 'writes'))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'reads': counters['reads'] / options['seconds'],
+            'writes': counters['writes'] / options['seconds'],
+            'busy': counters['busy'],
+        }
@@ -0,0 +1,98 @@
+import logging
+import os
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from core import jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи фоновой очереди core.jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Сколько задач выполнять одновременно (потоков)')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти')
+        parser.add_argument(
+            '--poll', type=float, default=None,
+            help='Пауза между проверками пустой очереди, секунд '
+                 '(по умолчанию JOBS_POLL_INTERVAL)')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('Нужен хотя бы один поток.')
+        if options['poll'] is None:
+            options['poll'] = settings.JOBS_POLL_INTERVAL
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.done = self.failed = 0
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        try:
+            if options['concurrency'] == 1:
+                self.work(f'{name}:0', options)
+            else:
+                self.work_in_threads(name, options)
+        except KeyboardInterrupt:
+            # Прерванная задача достанется воркеру через JOBS_LOCK_TIMEOUT.
+            self.stop.set()
+        self.stdout.write(
+            f'Выполнено задач: {self.done}, с ошибкой: {self.failed}')
+
+    def work_in_threads(self, name, options):
+        threads = [
+            threading.Thread(
+                target=self.work_in_thread,
+                args=(f'{name}:{number}', options),
+                name=f'jobs-{number}')
+            for number in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(1)
+        except KeyboardInterrupt:
+            # Начатые задачи дорабатывают, новые не берутся.
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def work_in_thread(self, worker, options):
+        try:
+            self.work(worker, options, connections=True)
+        finally:
+            close_old_connections()
+
+    def work(self, worker, options, connections=False):
+        while not self.stop.is_set():
+            if connections:
+                # Поток живет долго: соединение обновляем по CONN_MAX_AGE.
+                close_old_connections()
+            try:
+                task = jobs.claim(worker)
+                if task is not None:
+                    self.count(jobs.run(task))
+            except DatabaseError:
+                logger.exception('Ошибка базы в очереди задач')
+                task = None
+            if task is None:
+                if options['once']:
+                    return
+                self.stop.wait(options['poll'])
+
+    def count(self, succeeded):
+        with self.lock:
+            if succeeded:
+                self.done += 1
+            else:
+                self.failed += 1
@@ -0,0 +1,135 @@
+"""Метрики запросов по именам представлений.
+
+Каждый процесс копит метрики в памяти и время от времени сохраняет их
+в METRICS_DIR/<pid>.json. Эндпоинт /metrics складывает файлы всех
+процессов, поэтому при нескольких воркерах видна общая картина.
+Каталог нужно очищать при каждом перезапуске сервиса, иначе
+в суммы попадут воркеры прошлых запусков.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNTERS = (
+    ('db_queries_total', 'queries', 'Число SQL-запросов'),
+    ('db_duration_seconds_total', 'db_seconds', 'Время SQL-запросов'),
+    ('template_duration_seconds_total', 'template_seconds',
+     'Время рендеринга шаблонов'),
+    ('cache_hits_total', 'cache_hits', 'Попадания в кеш'),
+    ('cache_misses_total', 'cache_misses', 'Промахи кеша'),
+)
+PREFIX = 'yatube_'
+
+
+def _empty():
+    return {
+        'buckets': [0] * len(BUCKETS),
+        'count': 0,
+        'sum': 0.0,
+        **{field: 0 for _, field, _ in COUNTERS},
+    }
+
+
+class MetricsStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed = 0.0
+
+    def observe(self, view, seconds, **counters):
+        with self.lock:
+            metrics = self.views.setdefault(view, _empty())
+            metrics['count'] += 1
+            metrics['sum'] += seconds
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    metrics['buckets'][index] += 1
+            for field, value in counters.items():
+                metrics[field] += value
+        if time.monotonic() - self.flushed > settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.views))
+
+    def flush(self):
+        """Атомарно записывает метрики процесса в общий каталог."""
+        self.flushed = time.monotonic()
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Метрики всех процессов: файлы остальных плюс свои из памяти."""
+        merged = {}
+        for snapshot in [self.snapshot(), *_other_snapshots()]:
+            for view, metrics in snapshot.items():
+                total = merged.setdefault(view, _empty())
+                for field, value in metrics.items():
+                    if field == 'buckets':
+                        total[field] = [
+                            a + b for a, b in zip(total[field], value)]
+                    elif field in total:
+                        total[field] += value
+        return merged
+
+
+def _other_snapshots():
+    directory = settings.METRICS_DIR
+    if not directory or not os.path.isdir(directory):
+        return
+    own = f'{os.getpid()}.json'
+    for entry in os.scandir(directory):
+        if entry.name == own or not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as snapshot:
+                yield json.load(snapshot)
+        except (OSError, ValueError):
+            continue
+
+
+store = MetricsStore()
+
+
+def _labels(view, **extra):
+    labels = {'view': view, **extra}
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('"', '\\"'))
+        for name, value in labels.items())
+
+
+def render(views):
+    """Метрики в текстовом формате Prometheus."""
+    name = f'{PREFIX}request_duration_seconds'
+    lines = [
+        f'# HELP {name} Время обработки запроса',
+        f'# TYPE {name} histogram',
+    ]
+    for view, metrics in sorted(views.items()):
+        for bound, amount in zip(BUCKETS, metrics['buckets']):
+            lines.append(
+                f'{name}_bucket{{{_labels(view, le=bound)}}} {amount}')
+        lines.append(
+            f'{name}_bucket{{{_labels(view, le="+Inf")}}} '
+            f'{metrics["count"]}')
+        lines.append(f'{name}_sum{{{_labels(view)}}} {metrics["sum"]}')
+        lines.append(f'{name}_count{{{_labels(view)}}} {metrics["count"]}')
+    for suffix, field, description in COUNTERS:
+        name = f'{PREFIX}{suffix}'
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for view, metrics in sorted(views.items()):
+            lines.append(f'{name}{{{_labels(view)}}} {metrics[field]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,33 @@
+import time
+
+from django.db import connection
+
+from .instrumentation import QueryTimer, cache_counter, template_timer
+from .metrics import store
+
+
+class MetricsMiddleware:
+    """Собирает время запроса, SQL, шаблонов и обращения к кешу
+    по имени представления."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        with connection.execute_wrapper(queries), \
+                template_timer() as rendering, cache_counter() as cache:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        store.observe(
+            match.view_name if match else 'unresolved',
+            elapsed,
+            queries=queries.count,
+            db_seconds=queries.time,
+            template_seconds=rendering.time,
+            cache_hits=cache.hits,
+            cache_misses=cache.misses,
+        )
+        return response
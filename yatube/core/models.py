@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreatedModel(models.Model):
@@ -10,3 +11,56 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Job(CreatedModel):
+    """Задача фоновой очереди (core.jobs)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(max_length=255, verbose_name='Функция')
+    payload = models.TextField(
+        verbose_name='Аргументы',
+        help_text='JSON [args, kwargs]')
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Статус')
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Предел попыток')
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Воркер')
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+
+    class Meta:
+        verbose_name_plural = 'Задачи'
+        verbose_name = 'Задача'
+        indexes = [
+            models.Index(
+                fields=['status', 'priority', 'run_at'],
+                name='job_status_priority_run_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
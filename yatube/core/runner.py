@@ -0,0 +1,26 @@
+"""Запуск тестов manage.py test."""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner, который пишет метрики во временный каталог.
+
+    Middleware метрик сохраняет их после каждого запроса тестового
+    клиента, а общий METRICS_DIR читает /metrics рабочего сервиса.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.mkdtemp(prefix='yatube-metrics-')
+        self.metrics_settings = override_settings(
+            METRICS_DIR=self.metrics_dir)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.metrics_settings.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под именем из sha256 содержимого.
+
+    Одинаковые загрузки занимают место на диске один раз, а копии,
+    которые строятся по имени файла, общие для всех его владельцев.
+    Имя вида posts/ab/cd/abcd…ef.jpg: два уровня каталогов по первым
+    символам хеша, чтобы в одном каталоге не копились сотни тысяч файлов.
+    Сколько записей ссылается на файл, считается по самим записям.
+    """
+
+    @staticmethod
+    def hashed_name(directory, digest, extension):
+        return '/'.join(filter(None, (
+            directory, digest[:2], digest[2:4], digest + extension.lower())))
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя задает хеш; совпадение имен означает дубликат.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name.replace('\\', '/'))
+        extension = os.path.splitext(basename)[1]
+        os.makedirs(self.path(directory), exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.path(directory), suffix='.upload')
+        try:
+            with os.fdopen(descriptor, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = self.hashed_name(directory, digest.hexdigest(), extension)
+            path = self.path(name)
+            try:
+                # Дубликат: файл уже есть. Время изменения обновляется,
+                # иначе старый файл, на который еще не ссылается
+                # незакоммиченный пост, удалил бы gc_media --grace.
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temporary, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+            else:
+                os.remove(temporary)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+content_storage = ContentAddressedStorage()
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и сжатыми копиями.
+
+    collectstatic кладет рядом с каждым текстовым файлом .gz и, если
+    установлен пакет brotli, .br, когда сжатие заметно уменьшает файл.
+    Файлы, которых нет в манифесте (collectstatic еще не запускали),
+    отдаются под исходными именами.
+    """
+
+    manifest_strict = False
+    compressed_extensions = (
+        '.css', '.js', '.map', '.svg', '.ico', '.json', '.txt', '.xml',
+        '.html',
+    )
+    encodings = {'br': '.br', 'gzip': '.gz'}
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    @cached_property
+    def immutable_names(self):
+        """Имена с хешем: их содержимое никогда не меняется."""
+        return frozenset(self.hashed_files.values())
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(self.compressed_extensions):
+                for compressed in self._compress(name):
+                    yield name, compressed, True
+
+    def _compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) >= len(content) * 0.95:
+                continue
+            with open(self.path(name + suffix), 'wb') as output:
+                output.write(compressed)
+            yield name + suffix
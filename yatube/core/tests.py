@@ -0,0 +1,360 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import jobs
+from .asgi import ASGIHandler
+from .management.commands.benchmark_asgi import scope
+from .metrics import store
+from .models import Job
+from .storage import ContentAddressedStorage
+
+
+class SQLitePragmasTests(TestCase):
+    def test_pragmas_applied_to_connection(self):
+        """Настройки SQLITE_PRAGMAS применяются к соединению."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('PRAGMA есть только у SQLite')
+        with connection.cursor() as cursor:
+            for name in ('busy_timeout', 'cache_size'):
+                cursor.execute(f'PRAGMA {name}')
+                with self.subTest(pragma=name):
+                    self.assertEqual(
+                        cursor.fetchone()[0], settings.SQLITE_PRAGMAS[name])
+
+    def test_benchmark_reports_both_modes(self):
+        """Бенчмарк сравнивает настройки по умолчанию и SQLITE_PRAGMAS."""
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', readers=2, writers=1, seconds=0.2,
+            rows=100, stdout=out)
+        self.assertIn('default:', out.getvalue())
+        self.assertIn('tuned:', out.getvalue())
+
+
+class TestRunnerTests(TestCase):
+    def test_metrics_dir_isolated(self):
+        """Тесты не пишут метрики в общий каталог сервиса."""
+        self.assertNotEqual(
+            settings.METRICS_DIR,
+            os.path.join(tempfile.gettempdir(), 'yatube-metrics'))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        store.views.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        metrics_dir = override_settings(METRICS_DIR=directory)
+        metrics_dir.enable()
+        self.addCleanup(metrics_dir.disable)
+        self.client = Client()
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_metrics_by_view_name(self):
+        """Для представления считаются запросы, SQL и обращения к кешу."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        metrics = self.metrics()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            metrics)
+        index = store.views['posts:index']
+        self.assertGreater(index['queries'], 0)
+        self.assertGreater(index['template_seconds'], 0)
+        self.assertGreater(index['cache_hits'] + index['cache_misses'], 0)
+
+    def test_metrics_merged_across_processes(self):
+        """Метрики других воркеров читаются из общего каталога."""
+        self.client.get(reverse('posts:index'))
+        other = json.loads(json.dumps(store.views))
+        with open(os.path.join(settings.METRICS_DIR, '1.json'), 'w') as f:
+            json.dump(other, f)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            self.metrics())
+
+    def test_metrics_hidden_from_other_addresses(self):
+        """Эндпоинт недоступен с посторонних адресов."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, True)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_name_is_sharded_content_hash(self):
+        """Имя файла — sha256 содержимого в двух уровнях каталогов."""
+        name = self.storage.save('posts/Photo.JPG', ContentFile(b'data'))
+        digest = hashlib.sha256(b'data').hexdigest()
+        self.assertEqual(
+            name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg')
+        with self.storage.open(name) as saved:
+            self.assertEqual(saved.read(), b'data')
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковое содержимое сохраняется одним файлом."""
+        first = self.storage.save('posts/a.png', ContentFile(b'same'))
+        second = self.storage.save('posts/b.png', ContentFile(b'same'))
+        other = self.storage.save('posts/c.png', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        files = [
+            name for _, _, names in os.walk(self.location) for name in names]
+        self.assertEqual(len(files), 2)
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        source = tempfile.mkdtemp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source, True)
+        self.addCleanup(shutil.rmtree, root, True)
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'w') as css:
+            css.write('body { margin: 0; }\n' * 200)
+        override = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.root = root
+
+    def hashed_name(self):
+        with open(os.path.join(self.root, 'staticfiles.json')) as manifest:
+            return json.load(manifest)['paths']['css/site.css']
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic пишет файл с хешем в имени и его .gz-копию."""
+        name = self.hashed_name()
+        self.assertRegex(name, r'^css/site\.[0-9a-f]{12}\.css$')
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.root, name + '.gz')))
+
+    def test_hashed_file_served_compressed_and_cached(self):
+        """Сжатая копия отдается по Accept-Encoding и кешируется надолго."""
+        name = self.hashed_name()
+        response = self.client.get(
+            f'{settings.STATIC_URL}{name}', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            b'body { margin: 0; }\n' * 200)
+
+    def test_plain_file_without_accept_encoding(self):
+        """Без Accept-Encoding отдается исходный файл без долгого кеша."""
+        response = self.client.get(f'{settings.STATIC_URL}css/site.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            self.client.get(f'{settings.STATIC_URL}../settings.py')
+            .status_code, 404)
+
+
+calls = []
+
+
+@jobs.job
+def remember(value):
+    calls.append(value)
+
+
+@jobs.job(priority=10)
+def remember_first(value):
+    calls.append(value)
+
+
+@jobs.job(max_attempts=2)
+def explode():
+    raise ValueError('boom')
+
+
+def call_asgi(application, scope, body=b'', disconnect=False):
+    """Ответ ASGI-приложения: (начало, тело, все сообщения)."""
+    messages = [{'type': 'http.request', 'body': body}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect:
+            return {'type': 'http.disconnect'}
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        sent.append(message)
+        # Даем наблюдателю за клиентом получить http.disconnect.
+        await asyncio.sleep(0)
+
+    asyncio.run(application(scope, receive, send))
+    # Ушедшему клиенту ответ может не начаться вовсе.
+    start = sent[0] if sent else None
+    return start, b''.join(m.get('body', b'') for m in sent[1:]), sent
+
+
+class ASGIHandlerTests(TestCase):
+    def test_page_served_through_thread_pool(self):
+        """Django-страница отдается через ASGI-вход целиком."""
+        start, body, _ = call_asgi(
+            ASGIHandler(WSGIHandler()), scope(reverse('about:author')))
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), start['headers'])
+        self.assertIn('Об авторе'.encode(), body)
+
+    def test_request_translated_to_environ(self):
+        """Тело, заголовки и строка запроса доходят до WSGI-приложения."""
+        def echo(environ, start_response):
+            start_response('201 Created', [('X-Echo', 'yes')])
+            length = int(environ['CONTENT_LENGTH'])
+            return [
+                environ['REQUEST_METHOD'].encode(), b' ',
+                environ['PATH_INFO'].encode('latin-1'), b'?',
+                environ['QUERY_STRING'].encode(), b' ',
+                environ['HTTP_X_TOKEN'].encode(), b' ',
+                environ['wsgi.input'].read(length),
+            ]
+
+        request = scope('/путь/?q=1')
+        request.update(method='POST', headers=[
+            (b'content-length', b'4'), (b'x-token', b'a'),
+            (b'x-token', b'b')])
+        start, body, _ = call_asgi(ASGIHandler(echo), request, b'data')
+        self.assertEqual(start['status'], 201)
+        self.assertEqual(start['headers'], [(b'x-echo', b'yes')])
+        self.assertEqual(
+            body, b'POST ' + '/путь/'.encode() + b'?q=1 a,b data')
+
+    def test_stream_closed_when_client_leaves(self):
+        """Потоковый ответ прекращается и закрывается, когда клиент ушел."""
+        closed = []
+
+        class Endless:
+            streaming = True
+
+            def __iter__(self):
+                while True:
+                    yield b'chunk'
+
+            def close(self):
+                closed.append(True)
+
+        def endless(environ, start_response):
+            start_response('200 OK', [])
+            return Endless()
+
+        _, _, sent = call_asgi(
+            ASGIHandler(endless), scope('/'), disconnect=True)
+        self.assertEqual(closed, [True])
+        self.assertLess(len(sent), 10)
+
+    def test_benchmark_compares_interfaces(self):
+        """Бенчмарк сообщает пропускную способность WSGI и ASGI."""
+        output = StringIO()
+        call_command(
+            'benchmark_asgi', requests=4, concurrency=2,
+            paths=[reverse('about:author')], stdout=output)
+        self.assertIn('wsgi: запросов/с', output.getvalue())
+        self.assertIn('ASGI/WSGI: x', output.getvalue())
+
+
+@override_settings(JOBS_RUN_INLINE=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_workers(self):
+        output = StringIO()
+        call_command('run_workers', once=True, stdout=output)
+        return output.getvalue()
+
+    def test_delayed_job_run_by_worker(self):
+        """delay() сохраняет задачу, воркер выполняет и удаляет ее."""
+        remember.delay('первый')
+        self.assertEqual(calls, [])
+        self.assertEqual(Job.objects.get().name, 'core.tests.remember')
+        output = self.run_workers()
+        self.assertEqual(calls, ['первый'])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('Выполнено задач: 1, с ошибкой: 0', output)
+
+    def test_priority_then_order(self):
+        """Сначала задачи с большим приоритетом, затем по очереди."""
+        remember.delay(1)
+        remember.delay(2)
+        remember_first.delay(3)
+        self.run_workers()
+        self.assertEqual(calls, [3, 1, 2])
+
+    def test_claim_is_exclusive(self):
+        """Взятую задачу другой воркер не получит, пока она не зависла."""
+        remember.delay(1)
+        remember.delay(2)
+        first, second = jobs.claim('a'), jobs.claim('b')
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertIsNone(jobs.claim('c'))
+        Job.objects.filter(pk=first.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1))
+        stolen = jobs.claim('c')
+        self.assertEqual(stolen.pk, first.pk)
+        self.assertEqual(stolen.attempts, 2)
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        """Брошенная на последней попытке задача не берется снова."""
+        remember.delay(1)
+        for attempt in range(1, 4):
+            task = jobs.claim(f'w{attempt}')
+            self.assertEqual(task.attempts, attempt)
+            Job.objects.filter(pk=task.pk).update(
+                locked_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(jobs.claim('w4'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIn('Воркер пропал', job.last_error)
+
+    @override_settings(JOBS_BACKOFF=60)
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача откладывается, после max_attempts — failed."""
+        explode.delay()
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertIn('с ошибкой: 1', self.run_workers())
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(
+            job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertIsNone(jobs.claim('a'))
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_workers()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertIn('Выполнено задач: 0', self.run_workers())
@@ -1,4 +1,17 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import metrics as metrics_store
 
 
 def page_not_found(request, exception):
@@ -15,3 +28,66 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        metrics_store.render(metrics_store.store.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        encoding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def _static_variant(request, path):
+    """Сжатая копия файла, если ее принимает клиент, иначе сам файл."""
+    accepted = _accepted_encodings(request)
+    encodings = getattr(staticfiles_storage, 'encodings', {})
+    for encoding, suffix in encodings.items():
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def serve_static(request, path):
+    """Отдает собранную статику из STATIC_ROOT.
+
+    Файлы с хешем в имени кешируются браузером на год, остальные
+    перепроверяются по Last-Modified. Для текстовых файлов выбирается
+    сжатая копия по Accept-Encoding.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    served, encoding = _static_variant(request, full_path)
+    stat = os.stat(served)
+    if not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime,
+            stat.st_size):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(full_path)
+    response = FileResponse(
+        open(served, 'rb'),
+        content_type=content_type or 'application/octet-stream')
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    immutable = getattr(staticfiles_storage, 'immutable_names', ())
+    if path in immutable:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_MAX_AGE}, immutable')
+    else:
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
+from PIL import Image
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+
+        # Pillow откажется декодировать картинку вдвое больше лимита,
+        # где бы ее ни открыли: в форме, sorl или при построении копий.
+        Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
@@ -0,0 +1,156 @@
+"""Версии лент для кэша фрагментов и страниц.
+
+Ключ фрагмента содержит текущую версию ленты, поэтому фрагменты можно
+хранить долго: при изменении постов, комментариев или подписок сигналы
+меняют версию только затронутых лент, и старые фрагменты больше
+не читаются. Страницы для гостей кешируются целиком по тому же
+принципу, и из тех же версий строится ETag страниц.
+
+Версии хранятся в базе (FeedVersion), а не в кеше: кеш у каждого
+процесса свой, и смену версии в одном процессе другие бы не увидели.
+Версия меняется в той же транзакции, что и данные ленты.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .models import FeedVersion
+
+INDEX = 'index'
+PULLED = 'follow:pulled'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'profile:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def post_feed(post_id):
+    return f'post:{post_id}'
+
+
+def versions(*feeds):
+    """Текущие версии лент одним запросом; у новой ленты версия '0'."""
+    found = dict(FeedVersion.objects.filter(
+        feed__in=feeds).values_list('feed', 'version'))
+    return [found.get(feed, '0') for feed in feeds]
+
+
+def request_versions(request, *feeds):
+    """versions() с запоминанием на время запроса: ETag, копия страницы
+    и фрагменты читают версии одним запросом к базе."""
+    known = request.__dict__.setdefault('_feed_versions', {})
+    missing = [feed for feed in feeds if feed not in known]
+    if missing:
+        known.update(zip(missing, versions(*missing)))
+    return [known[feed] for feed in feeds]
+
+
+def bump(*feeds):
+    """Сбрасывает кэш фрагментов перечисленных лент."""
+    if not feeds:
+        return
+    version = uuid.uuid4().hex
+    FeedVersion.objects.bulk_create(
+        [FeedVersion(feed=feed, version=version) for feed in set(feeds)],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True)
+    FeedVersion.objects.filter(feed__in=feeds).update(version=version)
+
+
+def feed_cache(request, *feeds):
+    """Контекст для {% cache %}: ключ из версий лент и курсора страницы."""
+    return {
+        'feed_cache_key': ':'.join(
+            [*feeds, *request_versions(request, *feeds),
+             request.GET.urlencode()]),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def _cached_response(entry):
+    response = HttpResponse(
+        entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def page_feeds(feeds, request, *args, **kwargs):
+    """Ленты страницы; поиск выполняется один раз за запрос."""
+    if not hasattr(request, '_page_feeds'):
+        request._page_feeds = feeds(request, *args, **kwargs)
+    return request._page_feeds
+
+
+def feed_etag(feeds):
+    """etag_func для condition: версии лент страницы, пользователь,
+    cookie CSRF и адрес с параметрами. Страница при этом не строится.
+
+    Форма комментария содержит токен CSRF: после его смены, например
+    при входе, сохраненная браузером копия страницы не годится.
+    """
+    def etag(request, *args, **kwargs):
+        current = page_feeds(feeds, request, *args, **kwargs)
+        if current is None:
+            return None
+        user = request.user.pk if request.user.is_authenticated else ''
+        raw = ':'.join([
+            *request_versions(request, *current), str(user),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            request.get_full_path()])
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
+
+
+def anonymous_page(feeds):
+    """Кеширует страницу целиком для гостей.
+
+    feeds(request, *args, **kwargs) возвращает ленты, от которых зависит
+    страница, или None, если кешировать не нужно. Копия хранится под
+    адресом страницы вместе с версиями лент. Когда версия сменилась,
+    страницу заново строит один запрос — тот, что взял блокировку
+    через cache.add; остальные до этого получают устаревшую копию.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            current = page_feeds(feeds, request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            key = 'page:{}'.format(hashlib.md5(
+                request.get_full_path().encode()).hexdigest())
+            current = request_versions(request, *current)
+            entry = cache.get(key)
+            if entry is not None and entry['versions'] == current:
+                return _cached_response(entry)
+            lock = f'{key}:lock'
+            if not cache.add(lock, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+                if entry is not None:
+                    return _cached_response(entry)
+                return view(request, *args, **kwargs)
+            try:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.cookies:
+                    cache.set(key, {
+                        'versions': current,
+                        'content': response.content,
+                        'content_type': response['Content-Type'],
+                    }, settings.PAGE_CACHE_TIMEOUT)
+            finally:
+                cache.delete(lock)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,36 @@
+from django.core.checks import Tags, Warning, register
+from django.db import connection
+
+from . import search
+
+TRIGGERS = [f'{search.TABLE}_{event}' for event in (
+    'insert', 'delete', 'update')]
+
+
+@register(Tags.database)
+def search_triggers(app_configs, **kwargs):
+    """Триггеры индекса поиска на месте.
+
+    SQLite молча удаляет их, когда миграция пересоздает posts_post,
+    и новые посты перестают находиться.
+    """
+    if not search.available():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE name = %s OR type = 'trigger' AND tbl_name = 'posts_post'",
+            [search.TABLE])
+        found = {name for _, name in cursor.fetchall()}
+    if search.TABLE not in found:
+        # Миграция 0018 еще не применена.
+        return []
+    missing = [name for name in TRIGGERS if name not in found]
+    if not missing:
+        return []
+    return [Warning(
+        'Нет триггеров индекса поиска: {}.'.format(', '.join(missing)),
+        hint='Выполните manage.py rebuild_search_index.',
+        obj='posts.Post',
+        id='posts.W001',
+    )]
@@ -0,0 +1,89 @@
+"""Денормализованные счетчики постов и комментариев.
+
+Обновляются атомарно выражениями F() из сигналов, которые выполняются
+в транзакции сохранения или каскадного удаления. Расхождения чинит
+команда manage.py recount.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Group, Post
+
+
+def _change_author(author_id, delta):
+    if delta > 0:
+        AuthorStats.objects.get_or_create(author_id=author_id)
+    # Уменьшение строку не создает: при каскадном удалении автора
+    # его счетчики уже удалены.
+    AuthorStats.objects.filter(
+        author_id=author_id, posts_count__gte=-delta
+    ).update(posts_count=F('posts_count') + delta)
+
+
+def _change_group(group_id, delta):
+    if group_id:
+        Group.objects.filter(
+            pk=group_id, posts_count__gte=-delta
+        ).update(posts_count=F('posts_count') + delta)
+
+
+def post_saved(post, created, old_group_id):
+    if created:
+        _change_author(post.author_id, 1)
+        _change_group(post.group_id, 1)
+    elif old_group_id != post.group_id:
+        _change_group(old_group_id, -1)
+        _change_group(post.group_id, 1)
+
+
+def post_deleted(post):
+    _change_author(post.author_id, -1)
+    _change_group(post.group_id, -1)
+
+
+def comment_changed(comment, delta):
+    Post.objects.filter(
+        pk=comment.post_id, comments_count__gte=-delta
+    ).update(comments_count=F('comments_count') + delta)
+
+
+def posts_amount(author):
+    """Число постов автора; stats стоит подгрузить через select_related."""
+    stats = getattr(author, 'stats', None)
+    return stats.posts_count if stats is not None else 0
+
+
+def _fix(queryset, field, real):
+    """Исправляет строки, где счетчик разошелся с реальным значением."""
+    drifted = queryset.annotate(
+        real=Coalesce(Subquery(real), 0)
+    ).exclude(**{field: F('real')}).values_list('pk', 'real')
+    fixed = 0
+    for pk, value in drifted.iterator():
+        fixed += queryset.filter(pk=pk).update(**{field: value})
+    return fixed
+
+
+def recount():
+    """Пересчитывает все счетчики; возвращает число исправленных строк."""
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(count=Count('pk')).values('count')
+    group_posts = Post.objects.filter(
+        group=OuterRef('pk')
+    ).order_by().values('group').annotate(count=Count('pk')).values('count')
+    author_posts = Post.objects.filter(
+        author=OuterRef('pk')
+    ).order_by().values('author').annotate(count=Count('pk')).values('count')
+    missing = Post.objects.filter(
+        author__stats__isnull=True
+    ).values_list('author', flat=True).distinct()
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=pk) for pk in missing],
+        ignore_conflicts=True)
+    return {
+        'posts': _fix(Post.objects.all(), 'comments_count', comments),
+        'groups': _fix(Group.objects.all(), 'posts_count', group_posts),
+        'authors': _fix(
+            AuthorStats.objects.all(), 'posts_count', author_posts),
+    }
@@ -0,0 +1,154 @@
+"""Уведомления о новых постах через Server-Sent Events.
+
+После коммита нового поста сигнал публикует его id в каналы INDEX
+и profile:<автор> брокера в памяти процесса. Поток клиента подписан
+на каналы своей ленты и, проснувшись, пересчитывает посты новее
+загруженной страницы: одним запросом по первичному ключу. Раз в
+SSE_HEARTBEAT секунд поток шлет комментарий-пинг и тоже пересчитывает,
+так что посты из других процессов приходят с этой задержкой.
+
+Каждый поток занимает поток сервера, поэтому одновременно отдается
+не больше SSE_MAX_STREAMS потоков, а через SSE_STREAM_TIMEOUT секунд поток
+закрывается, и браузер переподключается сам.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+
+class Broker:
+    """Каналы и очереди их подписчиков в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+
+    def subscribe(self, channels):
+        inbox = queue.SimpleQueue()
+        with self.lock:
+            for channel in channels:
+                self.channels[channel].add(inbox)
+        return inbox
+
+    def unsubscribe(self, inbox, channels):
+        with self.lock:
+            for channel in channels:
+                subscribers = self.channels.get(channel, set())
+                subscribers.discard(inbox)
+                if not subscribers:
+                    self.channels.pop(channel, None)
+
+    def publish(self, channels, message):
+        with self.lock:
+            inboxes = set().union(
+                *(self.channels.get(channel, ()) for channel in channels))
+        for inbox in inboxes:
+            inbox.put(message)
+
+
+class StreamSlots:
+    """Счетчик открытых потоков с пределом SSE_MAX_STREAMS."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+
+    def full(self):
+        return self.active >= settings.SSE_MAX_STREAMS
+
+    def acquire(self):
+        with self.lock:
+            if self.full():
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+
+
+broker = Broker()
+slots = StreamSlots()
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+class NewPostsStream:
+    """Тело ответа text/event-stream с числом новых постов ленты.
+
+    Место в slots и подписка берутся только при обходе и отдаются
+    в finally: ответ, который сервер так и не начал отдавать, ничего
+    не держит. Посты, вышедшие до подписки, учитывает первый подсчет.
+    """
+
+    def __init__(self, channels, count_new):
+        self.channels = channels
+        self.count_new = count_new
+        self.inbox = None
+        self.slot = False
+
+    def __iter__(self):
+        self.slot = slots.acquire()
+        if not self.slot:
+            # Место заняли, пока строился ответ: браузер придет снова.
+            yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+            return
+        self.inbox = broker.subscribe(self.channels)
+        try:
+            yield from self.events()
+        finally:
+            self.close()
+
+    def events(self):
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        deadline = time.monotonic() + settings.SSE_STREAM_TIMEOUT
+        sent = None
+        while True:
+            count = self.count_new()
+            if count != sent:
+                yield _event('posts', {'count': count})
+                sent = count
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                self.inbox.get(
+                    timeout=min(settings.SSE_HEARTBEAT, remaining))
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            # Пачка постов пересчитывается один раз.
+            while not self.inbox.empty():
+                self.inbox.get_nowait()
+
+    def close(self):
+        """Отдает подписку и место; вызывает сервер или finally обхода."""
+        inbox, self.inbox = self.inbox, None
+        if inbox is not None:
+            broker.unsubscribe(inbox, self.channels)
+        if self.slot:
+            self.slot = False
+            slots.release()
+
+
+def stream_response(channels, count_new):
+    """Поток событий или 503, если потоков уже SSE_MAX_STREAMS."""
+    if slots.full():
+        response = HttpResponse(status=503)
+        response['Retry-After'] = settings.SSE_HEARTBEAT
+        return response
+    response = StreamingHttpResponse(
+        NewPostsStream(channels, count_new),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Иначе nginx копит события в буфере.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,175 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается во входящие всех подписчиков автора, поэтому
+лента читается одним диапазоном по индексу (user, pub_date, post).
+Посты авторов, у которых подписчиков больше FEED_FANOUT_MAX_FOLLOWERS,
+не раскладываются: они подмешиваются в ленту при чтении. Такие авторы
+отмечены флагом AuthorStats.pulled, который сигналы подписок сверяют
+с числом подписчиков.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Count
+
+from core.jobs import job
+
+from .cache import (INDEX, PULLED, bump, follow_feed, group_feed,
+                    profile_feed)
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import CursorPaginator, MergedCursorPaginator
+
+
+def is_pulled(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id, pulled=True).exists()
+
+
+def post_feeds(author_id, *group_ids):
+    """Ленты, в которых показывается пост автора."""
+    feeds = [INDEX, profile_feed(author_id)]
+    feeds += [group_feed(group_id) for group_id in group_ids if group_id]
+    if is_pulled(author_id):
+        feeds.append(PULLED)
+    else:
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        feeds += [follow_feed(user_id) for user_id in followers]
+    return feeds
+
+
+def _set_pulled(author_id, pulled):
+    """Меняет флаг pulled автора; True, если он изменился.
+
+    Автору, который перестал быть «тяжелым», входящие подписчиков
+    дозаполняет задача backfill_followers: пока он был «тяжелым»,
+    его посты не раскладывались.
+    """
+    if pulled:
+        AuthorStats.objects.get_or_create(author_id=author_id)
+    changed = AuthorStats.objects.filter(
+        author_id=author_id, pulled=not pulled).update(pulled=pulled)
+    if changed:
+        bump(PULLED)
+        if not pulled:
+            backfill_followers.delay(author_id)
+    return bool(changed)
+
+
+def update_pulled(author_id):
+    """Сверяет флаг pulled автора с числом его подписчиков."""
+    followers = Follow.objects.filter(author_id=author_id).count()
+    return _set_pulled(
+        author_id, followers > settings.FEED_FANOUT_MAX_FOLLOWERS)
+
+
+def recount_pulled():
+    """Сверяет флаги pulled всех авторов; возвращает число исправленных."""
+    heavy = set(
+        Follow.objects.values('author').annotate(
+            followers=Count('pk')
+        ).filter(
+            followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('author', flat=True)
+    )
+    flagged = set(AuthorStats.objects.filter(
+        pulled=True).values_list('author_id', flat=True))
+    fixed = 0
+    for author_id in heavy ^ flagged:
+        fixed += _set_pulled(author_id, author_id in heavy)
+    return fixed
+
+
+def _entries(post, user_ids):
+    return [
+        FeedEntry(
+            user_id=user_id,
+            author_id=post.author_id,
+            post_id=post.pk,
+            pub_date=post.pub_date)
+        for user_id in user_ids
+    ]
+
+
+def fan_out(post):
+    """Раскладывает пост во входящие подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        _entries(post, followers.iterator()),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет во входящие подписчика последние посты автора."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').only('pk', 'pub_date', 'author_id')
+    FeedEntry.objects.bulk_create(
+        [entry
+         for post in posts[:settings.FEED_BACKFILL_LIMIT]
+         for entry in _entries(post, [user_id])],
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+@job(priority=5)
+def backfill_followers(author_id):
+    """Добавляет последние посты автора во входящие всех подписчиков."""
+    if is_pulled(author_id):
+        return
+    followers = list(Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True))
+    for user_id in followers:
+        backfill(user_id, author_id)
+    bump(*map(follow_feed, followers))
+
+
+def prune(user_id, author_id):
+    """Убирает из входящих подписчика посты автора."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает входящие пользователя с нуля."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id).values_list('author_id', flat=True)
+    for author_id in authors:
+        backfill(user_id, author_id)
+
+
+def _resolve_posts(posts, entries):
+    found = posts.in_bulk([entry.post_id for entry in entries])
+    return [found.get(entry.post_id) for entry in entries]
+
+
+def follow_paginator(user, posts=None):
+    """Пагинатор ленты подписок: входящие плюс посты «тяжелых» авторов.
+
+    posts — queryset, из которого берутся посты страницы (по умолчанию
+    Post.objects.for_feed()).
+    """
+    if posts is None:
+        posts = Post.objects.for_feed()
+    inbox = CursorPaginator(
+        FeedEntry.objects.filter(user=user).only('pub_date', 'post'),
+        settings.AMOUNT_POSTS,
+        keys=('pub_date', 'post_id'),
+        resolve=partial(_resolve_posts, posts))
+    pulled = list(Follow.objects.filter(
+        user=user, author__stats__pulled=True
+    ).values_list('author_id', flat=True))
+    if not pulled:
+        return inbox
+    # По источнику на автора: author IN (...) с сортировкой по дате
+    # заставил бы SQLite сортировать все посты этих авторов.
+    return MergedCursorPaginator([inbox] + [
+        CursorPaginator(
+            posts.filter(author_id=author_id), settings.AMOUNT_POSTS)
+        for author_id in pulled
+    ], settings.AMOUNT_POSTS)
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -15,6 +17,26 @@ class PostForm(forms.ModelForm):
             'group': forms.Select(attrs={'class': 'form-control'})
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+        uploads.validate(image)
+        return uploads.normalize(image)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        image = self.files.get('image')
+        if image is not None and self.has_error('image', 'invalid_image'):
+            # Обрезанный или слишком большой файл ImageField не открыл:
+            # сообщаем настоящую причину.
+            try:
+                uploads.validate(image)
+            except forms.ValidationError as error:
+                del self.errors['image']
+                self.add_error('image', error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
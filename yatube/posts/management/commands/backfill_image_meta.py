@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import renditions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, основной цвет и заглушку картинок постов, '
+        'сохраненных до появления этих полей.'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_width__isnull=True).only('image').order_by('pk')
+        filled = failed = 0
+        for post in posts.iterator():
+            try:
+                meta = renditions.describe(post.image)
+            except (OSError, ValueError):
+                failed += 1
+                continue
+            Post.objects.filter(pk=post.pk, image=post.image.name).update(
+                **meta)
+            filled += 1
+        self.stdout.write(f'Заполнено: {filled}, не прочитано: {failed}')
@@ -0,0 +1,166 @@
+import json
+import math
+import time
+
+from core.instrumentation import QueryTimer, template_timer
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Group, Post, User
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'add_comment',
+)
+COMPARED = ('p50_ms', 'p95_ms', 'queries')
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def regressions(results, baseline, threshold):
+    """Метрики, которые выросли больше чем на threshold процентов."""
+    found = []
+    for view, metrics in baseline.get('views', {}).items():
+        current = results['views'].get(view)
+        if current is None:
+            continue
+        for metric in COMPARED:
+            old, new = metrics.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            # Порог в 0.5 отсекает шум на очень быстрых страницах.
+            if new > old * (1 + threshold / 100) and new - old > 0.5:
+                found.append(f'{view}.{metric}: {old} -> {new}')
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет основные страницы через тестовый клиент и сообщает '
+        'перцентили времени ответа, число и время SQL-запросов и время '
+        'рендеринга шаблонов.'
+    )
+    comment_text = 'Комментарий бенчмарка'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=VIEWS)
+        parser.add_argument(
+            '--username',
+            help='От чьего имени открывать ленту подписок и комментировать '
+                 '(по умолчанию — пользователь с наибольшим числом подписок)')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом')
+        parser.add_argument('--output', help='Куда записать результаты JSON')
+        parser.add_argument(
+            '--baseline', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=20.0,
+            help='Допустимый рост метрик относительно baseline, %%')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один замер.')
+        targets = self.targets(options['username'])
+        results = {'requests': options['requests'], 'views': {}}
+        last_comment = Comment.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        try:
+            for view in options['views']:
+                request = targets.get(view)
+                if request is None:
+                    self.stdout.write(f'{view}: нет данных, пропущено')
+                    continue
+                stats = self.measure(request, options)
+                results['views'][view] = stats
+                self.stdout.write(
+                    '{}: p50 {p50_ms} мс, p95 {p95_ms} мс, p99 {p99_ms} мс, '
+                    'запросов {queries}, SQL {sql_ms} мс, '
+                    'шаблоны {template_ms} мс'.format(view, **stats))
+        finally:
+            Comment.objects.filter(
+                pk__gt=last_comment, text=self.comment_text).delete()
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                found = regressions(
+                    results, json.load(baseline), options['threshold'])
+            if found:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(found))
+
+    def targets(self, username):
+        """Запросы к каждой странице на самых «тяжелых» объектах базы."""
+        guest = Client()
+        targets = {'index': lambda: guest.get(reverse('posts:index'))}
+        group = Group.objects.order_by('-posts_count').first()
+        if group is not None:
+            url = reverse('posts:group_list', args=[group.slug])
+            targets['group_posts'] = lambda: guest.get(url)
+        stats = AuthorStats.objects.select_related('author').order_by(
+            '-posts_count').first()
+        if stats is not None:
+            profile_url = reverse('posts:profile', args=[stats.author])
+            targets['profile'] = lambda: guest.get(profile_url)
+        post = Post.objects.order_by('-comments_count').first()
+        if post is None:
+            return targets
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        targets['post_detail'] = lambda: guest.get(detail_url)
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.annotate(
+                follows=Count('follower')
+            ).order_by('-follows').first()
+        if user is None:
+            return targets
+        client = Client()
+        client.force_login(user)
+        targets['follow_index'] = lambda: client.get(
+            reverse('posts:follow_index'))
+        comment_url = reverse('posts:add_comment', args=[post.pk])
+        targets['add_comment'] = lambda: client.post(
+            comment_url, {'text': self.comment_text})
+        return targets
+
+    def measure(self, request, options):
+        latencies, queries, sql, templates = [], [], [], []
+        for number in range(options['warmup'] + options['requests']):
+            if options['cold']:
+                cache.clear()
+            timer = QueryTimer()
+            with connection.execute_wrapper(timer), \
+                    template_timer() as rendering:
+                start = time.perf_counter()
+                response = request()
+                elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise CommandError(f'Ответ {response.status_code}')
+            if number < options['warmup']:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(timer.count)
+            sql.append(timer.time * 1000)
+            templates.append(rendering.time * 1000)
+        return {
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': round(sum(queries) / len(queries), 2),
+            'sql_ms': round(sum(sql) / len(sql), 2),
+            'template_ms': round(sum(templates) / len(templates), 2),
+        }
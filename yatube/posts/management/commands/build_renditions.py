@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import renditions
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит готовые копии картинок постов, у которых их еще нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить копии всех постов с картинками')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(renditions='')
+        built = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            renditions.generate(post_id)
+            built += 1
+        self.stdout.write(f'Обработано постов: {built}')
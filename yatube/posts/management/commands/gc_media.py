@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import media
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, на которые не ссылается ни один пост, '
+        'их миниатюры и адаптивные копии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено')
+        parser.add_argument(
+            '--grace', type=int, default=settings.MEDIA_GC_GRACE,
+            help='Не трогать файлы моложе стольких секунд')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько файлов сверять с базой за один запрос')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        scan = options['grace'], options['chunk_size']
+        files = reclaimed = 0
+        for name, size in media.orphaned_originals(*scan):
+            if name.endswith('.upload'):
+                # Недописанная загрузка: только сам файл.
+                if not dry_run:
+                    media.remove_file(name)
+                files, reclaimed = files + 1, reclaimed + size
+                continue
+            files += 1
+            reclaimed += size if dry_run else media.remove_image(name)
+        for name in media.orphaned_renditions(*scan):
+            files += 1
+            reclaimed += media.renditions_size(name) if dry_run else (
+                media.remove_renditions(name))
+        for name, size in media.orphaned_thumbnails(*scan):
+            if not dry_run:
+                media.remove_file(name)
+            files, reclaimed = files + 1, reclaimed + size
+        verb = 'Будет удалено' if dry_run else 'Удалено'
+        self.stdout.write(
+            f'{verb}: {files}, освобождено байт: {reclaimed}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс постов и восстанавливает '
+        'его триггеры.'
+    )
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        search.rebuild()
+        self.stdout.write(f'Проиндексировано постов: {Post.objects.count()}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters, feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов и комментариев и флаги «тяжелых» '
+        'авторов.'
+    )
+
+    def handle(self, *args, **options):
+        for name, fixed in counters.recount().items():
+            self.stdout.write(f'{name}: исправлено {fixed}')
+        self.stdout.write(f'pulled: исправлено {feed.recount_pulled()}')
@@ -0,0 +1,247 @@
+import io
+import random
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts import counters, feed
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+
+WORDS = (
+    'день ночь город море лес река дом дорога книга письмо друг время '
+    'утро вечер солнце ветер дождь снег поезд окно сад кот собака '
+    'работа отпуск музыка кино чай кофе гора поле мост небо звезда'
+).split()
+
+
+def power_law(count, alpha):
+    """Накопленные веса Ципфа: первые элементы выбираются намного чаще."""
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(count)))
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Отключает auto_now_add, чтобы bulk_create сохранил заданные даты."""
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями, подписками и картинками для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного распределения авторов и подписок')
+        parser.add_argument(
+            '--feed-limit', type=int, default=settings.FEED_BACKFILL_LIMIT,
+            help='Сколько постов автора положить во входящие подписчика '
+                 '(0 — не собирать ленты)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имен пользователей и адресов групп')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                'укажите другой --prefix.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        with explicit_dates(Post, Comment, Follow, Group):
+            users = self.create_users(prefix, options['users'])
+            groups = self.create_groups(prefix, options['groups'])
+            images = self.create_images(prefix, options['images'])
+            weights = power_law(len(users), options['alpha'])
+            posts = self.create_posts(
+                options['posts'], users, weights, groups, images)
+            self.create_comments(options['comments'], users, posts)
+            pairs = self.create_follows(options['follows'], users, weights)
+        if options['feed_limit'] > 0:
+            self.create_feeds(posts, pairs, options['feed_limit'])
+        self.stdout.write('Пересчет счетчиков...')
+        counters.recount()
+        feed.recount_pulled()
+        self.stdout.write(self.style.SUCCESS('Готово.'))
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def date(self):
+        return self.now - timedelta(
+            seconds=self.rng.randint(0, self.days * 24 * 60 * 60))
+
+    def bulk_create(self, model, objects):
+        created = 0
+        for chunk in chunks(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(chunk)
+            created += len(chunk)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {created}')
+
+    def new_pks(self, model, last_pk):
+        # SQLite не возвращает pk из bulk_create, новые строки ищем по pk.
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True))
+
+    def last_pk(self, model):
+        last = model.objects.order_by('-pk').values_list('pk', flat=True)
+        return last.first() or 0
+
+    def create_users(self, prefix, count):
+        last_pk = self.last_pk(User)
+        password = make_password(None)
+        self.bulk_create(User, (
+            User(
+                username=f'{prefix}_{number}',
+                first_name=self.rng.choice(WORDS).capitalize(),
+                password=password)
+            for number in range(count)
+        ))
+        return self.new_pks(User, last_pk)
+
+    def create_groups(self, prefix, count):
+        last_pk = self.last_pk(Group)
+        self.bulk_create(Group, (
+            Group(
+                title=self.text(1, 3).capitalize(),
+                slug=f'{prefix}-{number}',
+                description=self.text(5, 20),
+                created=self.date())
+            for number in range(count)
+        ))
+        return self.new_pks(Group, last_pk)
+
+    def create_images(self, prefix, count):
+        upload_to = Post._meta.get_field('image').upload_to
+        names = []
+        for number in range(count):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            size = (self.rng.randint(200, 1200), self.rng.randint(200, 900))
+            buffer = io.BytesIO()
+            Image.new('RGB', size, color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'{upload_to}{prefix}_{number}.jpg',
+                ContentFile(buffer.getvalue())))
+        self.stdout.write(f'Картинки: {len(names)}')
+        return names
+
+    def create_posts(self, count, users, weights, groups, images):
+        last_pk = self.last_pk(Post)
+        dates = sorted(self.date() for _ in range(count))
+        authors = self.rng.choices(users, cum_weights=weights, k=count)
+        self.bulk_create(Post, (
+            Post(
+                text=self.text(5, 80),
+                author_id=author_id,
+                group_id=(
+                    self.rng.choice(groups)
+                    if groups and self.rng.random() < 0.5 else None),
+                image=(
+                    self.rng.choice(images)
+                    if images and self.rng.random() < 0.2 else ''),
+                pub_date=date,
+                created=date)
+            for author_id, date in zip(authors, dates)
+        ))
+        return list(zip(self.new_pks(Post, last_pk), dates, authors))
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return
+        # Свежие посты комментируют чаще старых.
+        weights = power_law(len(posts), 0.8)
+        targets = self.rng.choices(
+            posts[::-1], cum_weights=weights, k=count)
+        self.bulk_create(Comment, (
+            Comment(
+                post_id=post_id,
+                author_id=self.rng.choice(users),
+                text=self.text(2, 30),
+                created=min(
+                    self.now,
+                    date + timedelta(
+                        minutes=self.rng.randint(1, 7 * 24 * 60))))
+            for post_id, date, _ in targets
+        ))
+
+    def create_follows(self, count, users, weights):
+        count = min(count, len(users) * (len(users) - 1))
+        pairs = set()
+        attempts = count * 20
+        while len(pairs) < count and attempts:
+            attempts -= 1
+            user_id = self.rng.choice(users)
+            author_id = self.rng.choices(users, cum_weights=weights)[0]
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        self.bulk_create(Follow, (
+            Follow(user_id=user_id, author_id=author_id, created=self.date())
+            for user_id, author_id in sorted(pairs)
+        ))
+        return sorted(pairs)
+
+    def create_feeds(self, posts, pairs, limit):
+        """Раскладывает посты во входящие так же, как feed.backfill.
+
+        Данные уже в памяти, поэтому ленты строятся без запроса
+        на каждого подписчика.
+        """
+        followers = Counter(author_id for _, author_id in pairs)
+        newest = defaultdict(list)
+        for post_id, date, author_id in reversed(posts):
+            if len(newest[author_id]) < limit:
+                newest[author_id].append((post_id, date))
+        self.bulk_create(FeedEntry, (
+            FeedEntry(
+                user_id=user_id, author_id=author_id,
+                post_id=post_id, pub_date=date)
+            for user_id, author_id in pairs
+            if followers[author_id] <= settings.FEED_FANOUT_MAX_FOLLOWERS
+            for post_id, date in newest[author_id]
+        ))
@@ -0,0 +1,200 @@
+"""Сборка мусора в MEDIA_ROOT.
+
+Файл картинки общий для всех постов с тем же содержимым, поэтому
+удалять его можно только когда на него не ссылается ни один пост.
+Вместе с оригиналом удаляются его копии: миниатюры sorl и адаптивные
+копии в renditions/<имя оригинала>/.
+"""
+import os
+import shutil
+import time
+from itertools import groupby, islice
+
+from django.conf import settings
+from sorl.thumbnail import default, delete
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+
+RENDITIONS_DIR = 'renditions'
+CACHED_DB_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+
+
+def references(name):
+    """Сколько постов ссылается на файл картинки."""
+    return Post.objects.filter(image=name).count()
+
+
+def renditions_dir(name):
+    return f'{RENDITIONS_DIR}/{name}'
+
+
+def _prune(path):
+    """Удаляет опустевшие каталоги над удаленным файлом."""
+    root = os.path.abspath(settings.MEDIA_ROOT)
+    directory = os.path.dirname(os.path.abspath(path))
+    while directory != root and directory.startswith(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def renditions_size(name):
+    return _tree_size(os.path.join(settings.MEDIA_ROOT, renditions_dir(name)))
+
+
+def remove_renditions(name):
+    path = os.path.join(settings.MEDIA_ROOT, renditions_dir(name))
+    size = _tree_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    _prune(path)
+    return size
+
+
+def _tree_size(path):
+    return sum(size for _, size, _ in _walk(path, path))
+
+
+def remove_image(name):
+    """Удаляет оригинал, его миниатюры и копии; возвращает число байт."""
+    storage = Post._meta.get_field('image').storage
+    reclaimed = remove_renditions(name)
+    if storage.exists(name):
+        reclaimed += storage.size(name)
+    reclaimed += _thumbnails_size(ImageFile(name, storage))
+    delete(ImageFile(name, storage), delete_file=True)
+    _prune(storage.path(name))
+    return reclaimed
+
+
+def remove_file(name):
+    """Удаляет файл из MEDIA_ROOT и опустевшие каталоги над ним."""
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _prune(path)
+
+
+def _thumbnails_size(image):
+    size = 0
+    for key in default.kvstore._get(image.key, identity='thumbnails') or ():
+        thumbnail = default.kvstore._get(key)
+        if thumbnail and thumbnail.exists():
+            size += thumbnail.storage.size(thumbnail.name)
+    return size
+
+
+def release(name):
+    """Удаляет файл картинки, если на него больше не ссылаются посты.
+
+    Файл моложе MEDIA_GC_GRACE остается: его могла переиспользовать
+    незакоммиченная загрузка. Если он осиротел, его уберет gc_media.
+    """
+    if not name or references(name):
+        return 0
+    storage = Post._meta.get_field('image').storage
+    try:
+        mtime = os.path.getmtime(storage.path(name))
+    except FileNotFoundError:
+        mtime = 0
+    if mtime > time.time() - settings.MEDIA_GC_GRACE:
+        return 0
+    return remove_image(name)
+
+
+def _walk(root, path):
+    """Файлы под path: (имя относительно root, размер, mtime).
+
+    os.scandir обходит каталоги лениво, память не зависит от их размера.
+    """
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(root, entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat()
+                name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                yield name, stat.st_size, stat.st_mtime
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _old_files(directory, grace):
+    """Файлы каталога MEDIA_ROOT старше grace секунд.
+
+    Свежие файлы пропускаются: загрузка могла сохранить файл, но еще
+    не закоммитить пост, который на него ссылается.
+    """
+    deadline = time.time() - grace
+    root = settings.MEDIA_ROOT
+    for name, size, mtime in _walk(root, os.path.join(root, directory)):
+        if mtime < deadline:
+            yield name, size
+
+
+def orphaned_originals(grace, chunk_size):
+    """Оригиналы, на которые не ссылается ни один пост."""
+    directory = Post._meta.get_field('image').upload_to
+    for chunk in _chunks(_old_files(directory, grace), chunk_size):
+        live = set(Post.objects.filter(
+            image__in=[name for name, _ in chunk]
+        ).values_list('image', flat=True))
+        for name, size in chunk:
+            if name not in live:
+                yield name, size
+
+
+def orphaned_renditions(grace, chunk_size):
+    """Каталоги адаптивных копий картинок, которых больше нет у постов."""
+    prefix = f'{RENDITIONS_DIR}/'
+    # Обход выдает файлы одного каталога подряд.
+    names = (
+        directory[len(prefix):] for directory, _ in groupby(
+            os.path.dirname(name)
+            for name, _ in _old_files(RENDITIONS_DIR, grace)))
+    for chunk in _chunks(names, chunk_size):
+        live = set(Post.objects.filter(
+            image__in=chunk).values_list('image', flat=True))
+        for name in chunk:
+            if name not in live:
+                yield name
+
+
+def orphaned_thumbnails(grace, chunk_size):
+    """Миниатюры sorl, о которых не знает хранилище ключей sorl.
+
+    Миниатюры живых картинок всегда записаны в KVStore, поэтому файл
+    без записи остался от удаленного в обход sorl оригинала.
+    """
+    if thumbnail_settings.THUMBNAIL_KVSTORE != CACHED_DB_KVSTORE:
+        return
+    storage = default.storage
+    old_files = _old_files(thumbnail_settings.THUMBNAIL_PREFIX, grace)
+    for chunk in _chunks(old_files, chunk_size):
+        keys = {
+            add_prefix(ImageFile(name, storage).key): (name, size)
+            for name, size in chunk
+        }
+        known = set(KVStore.objects.filter(
+            key__in=list(keys)).values_list('key', flat=True))
+        for key, (name, size) in keys.items():
+            if key not in known:
+                yield name, size
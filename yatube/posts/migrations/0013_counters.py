@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Comment = apps.get_model('posts', 'Comment')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    for post_id, count in Comment.objects.values_list(
+            'post').annotate(count=models.Count('pk')).order_by():
+        Post.objects.filter(pk=post_id).update(comments_count=count)
+    for group_id, count in Post.objects.exclude(group=None).values_list(
+            'group').annotate(count=models.Count('pk')).order_by():
+        Group.objects.filter(pk=group_id).update(posts_count=count)
+    AuthorStats.objects.bulk_create([
+        AuthorStats(author_id=author_id, posts_count=count)
+        for author_id, count in Post.objects.values_list(
+            'author').annotate(count=models.Count('pk')).order_by()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+            ],
+            options={
+                'verbose_name': 'Счетчики автора',
+                'verbose_name_plural': 'Счетчики авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='renditions',
+            field=models.TextField(blank=True, editable=False, help_text='JSON с адресами и размерами готовых копий', verbose_name='Копии картинки'),
+        ),
+    ]
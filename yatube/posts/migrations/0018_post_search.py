@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# SQL записан здесь, а не взят из posts.search: миграция не должна
+# меняться вместе с кодом приложения.
+CREATE_SQL = [
+    "CREATE VIEW IF NOT EXISTS posts_post_fts_source AS SELECT id, "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') AS text FROM posts_post",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, content='posts_post_fts_source', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    '''CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id,
+                replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id,
+                replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+    END''',
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+    'DROP VIEW IF EXISTS posts_post_fts_source',
+]
+
+
+def execute(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(execute(CREATE_SQL), execute(DROP_SQL)),
+    ]
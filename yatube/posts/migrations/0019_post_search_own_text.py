@@ -0,0 +1,54 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Индекс с собственной копией текста вместо представления над posts_post:
+# представление ломало любую миграцию, пересоздающую posts_post.
+CREATE_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+    'DROP VIEW IF EXISTS posts_post_fts_source',
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, tokenize='unicode61 remove_diacritics 2')",
+    '''CREATE TRIGGER posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text)
+        VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+    END''',
+    '''CREATE TRIGGER posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        DELETE FROM posts_post_fts WHERE rowid = old.id;
+    END''',
+    '''CREATE TRIGGER posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        UPDATE posts_post_fts
+        SET text = replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')
+        WHERE rowid = new.id;
+    END''',
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM posts_post",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+]
+
+previous = import_module('posts.migrations.0018_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            previous.execute(CREATE_SQL),
+            previous.execute(DROP_SQL + previous.CREATE_SQL)),
+    ]
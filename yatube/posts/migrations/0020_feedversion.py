@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_search_own_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedVersion',
+            fields=[
+                ('feed', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Лента')),
+                ('version', models.CharField(max_length=32, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия ленты',
+                'verbose_name_plural': 'Версии лент',
+            },
+        ),
+    ]
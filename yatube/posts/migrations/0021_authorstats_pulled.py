@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_pulled(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Follow = apps.get_model('posts', 'Follow')
+    heavy = list(
+        Follow.objects.values('author').annotate(
+            followers=models.Count('pk')
+        ).filter(
+            followers__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('author', flat=True)
+    )
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(author_id=pk) for pk in heavy], ignore_conflicts=True)
+    AuthorStats.objects.filter(author_id__in=heavy).update(pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_feedversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='pulled',
+            field=models.BooleanField(default=False, help_text='Подписчиков больше FEED_FANOUT_MAX_FOLLOWERS', verbose_name='Посты подмешиваются в ленты при чтении'),
+        ),
+        migrations.RunPython(fill_pulled, migrations.RunPython.noop),
+    ]
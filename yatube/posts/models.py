@@ -1,12 +1,52 @@
+import json
+
 from core.models import CreatedModel
+from core.storage import content_storage
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
 
-class Post(CreatedModel):
+class CountersMixin:
+    """Полный save() не перезаписывает счетчики COUNTERS.
+
+    Счетчики меняются только выражениями F() в posts.counters, а
+    экземпляр, прочитанный раньше (форма редактирования, админка),
+    вернул бы в базу устаревшее значение.
+    """
+    COUNTERS = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and not kwargs.get('force_insert')
+                and kwargs.get('update_fields') is None):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTERS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для лент: автор и группа одним запросом, без лишних полей,
+        с числом комментариев."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'renditions', 'image_width',
+            'image_height', 'image_color', 'image_placeholder',
+            'comments_count', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        )
+
+
+class Post(CountersMixin, CreatedModel):
     text = models.TextField(
         verbose_name='Текст',
         help_text='Введите текст поста')
@@ -29,21 +69,81 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев')
+    renditions = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Копии картинки',
+        help_text='JSON с адресами и размерами готовых копий')
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина картинки')
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Высота картинки')
+    image_color = models.CharField(
+        max_length=7,
+        blank=True,
+        editable=False,
+        verbose_name='Основной цвет картинки')
+    image_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Заглушка картинки',
+        help_text='Крошечное размытое превью в виде data URI')
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTERS = ('comments_count',)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name_plural = 'Посты'
         verbose_name = 'Пост'
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date'),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date'),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date'),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TEXT_SHORT]
 
+    @cached_property
+    def thumbnails(self):
+        """Готовые копии картинки по именам из POST_RENDITIONS."""
+        try:
+            return json.loads(self.renditions) if self.renditions else {}
+        except ValueError:
+            return {}
+
+    def save(self, *args, **kwargs):
+        # Счетчики обновляются в post_save, в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
-class Group(CreatedModel):
+class Group(CountersMixin, CreatedModel):
     title = models.CharField(max_length=200, verbose_name='Группа')
     slug = models.SlugField(unique=True, verbose_name='Адрес группы')
     description = models.TextField(verbose_name='Описание группы')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Постов')
+
+    COUNTERS = ('posts_count',)
 
     class Meta:
         verbose_name_plural = 'Группы'
@@ -72,10 +172,18 @@ class Comment(CreatedModel):
         ordering = ('-created',)
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
+        indexes = [
+            models.Index(
+                fields=['post', 'created'], name='comment_post_created'),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_TEXT_SHORT]
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Follow(CreatedModel):
     user = models.ForeignKey(
@@ -97,3 +205,84 @@ class Follow(CreatedModel):
                 fields=['user', 'author'],
                 name='unique follow')
         ]
+
+
+class AuthorStats(CountersMixin, models.Model):
+    """Счетчики автора, которые иначе пришлось бы считать COUNT(*)."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов')
+    pulled = models.BooleanField(
+        default=False,
+        verbose_name='Посты подмешиваются в ленты при чтении',
+        help_text='Подписчиков больше FEED_FANOUT_MAX_FOLLOWERS')
+
+    COUNTERS = ('posts_count', 'pulled')
+
+    class Meta:
+        verbose_name_plural = 'Счетчики авторов'
+        verbose_name = 'Счетчики автора'
+
+    def __str__(self):
+        return str(self.author_id)
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, разложенная по подписчикам при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост')
+    pub_date = models.DateTimeField(verbose_name='Опубликовано')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты'
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='feed_user_pub_date'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique feed entry')
+        ]
+
+
+class FeedVersion(models.Model):
+    """Версия ленты для ключей кеша фрагментов, страниц и ETag.
+
+    Хранится в базе, а не в кеше: смену версии видят все процессы,
+    и версия не пропадает при вытеснении из кеша.
+    """
+    feed = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='Лента')
+    version = models.CharField(max_length=32, verbose_name='Версия')
+
+    class Meta:
+        verbose_name_plural = 'Версии лент'
+        verbose_name = 'Версия ленты'
+
+    def __str__(self):
+        return self.feed
@@ -0,0 +1,218 @@
+"""Готовые копии картинок постов.
+
+Копии из POST_RENDITIONS и адаптивные копии RESPONSIVE_WIDTHS
+строятся один раз после сохранения новой картинки задачей очереди
+core.jobs, вне запроса. Их адреса и размеры хранятся в Post.renditions,
+поэтому ленты выводят картинки без обращения к файлам и хранилищу sorl.
+"""
+import base64
+import hashlib
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import job
+
+from . import feed, media
+from .cache import bump, post_feed
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_SIZE = (16, 16)
+EMPTY_META = {
+    'image_width': None,
+    'image_height': None,
+    'image_color': '',
+    'image_placeholder': '',
+}
+
+
+def describe(image):
+    """Размеры, основной цвет и крошечное размытое превью картинки."""
+    with image.open('rb'), Image.open(image) as source:
+        width, height = source.size
+        small = source.convert('RGB')
+        small.thumbnail((64, 64))
+    _, color = max(small.quantize(colors=8).convert('RGB').getcolors())
+    small.thumbnail(PLACEHOLDER_SIZE)
+    buffer = io.BytesIO()
+    small.save(buffer, 'JPEG', quality=40)
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': '#{:02x}{:02x}{:02x}'.format(*color),
+        'image_placeholder': 'data:image/jpeg;base64,' + base64.b64encode(
+            buffer.getvalue()).decode(),
+    }
+
+
+def build(image):
+    """Копии картинки по настройкам: {имя: {url, width, height}}."""
+    result = {}
+    for name, (geometry, options) in settings.POST_RENDITIONS.items():
+        thumbnail = get_thumbnail(image, geometry, **options)
+        result[name] = {
+            'url': thumbnail.url,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+        }
+    return result
+
+
+def supported_formats():
+    """Форматы из RESPONSIVE_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.RESPONSIVE_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def _save_variant(picture, name, image_format):
+    buffer = io.BytesIO()
+    picture.save(
+        buffer, image_format,
+        quality=settings.RESPONSIVE_QUALITY.get(image_format, 80))
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.url(
+        default_storage.save(name, ContentFile(buffer.getvalue())))
+
+
+def build_responsive(image):
+    """Копии карточки нескольких ширин в JPEG и современных форматах.
+
+    Возвращает srcset для JPEG и список <source> для форматов,
+    которые поддерживает установленный Pillow.
+    """
+    card_width, card_height = settings.RESPONSIVE_ASPECT
+    directory = media.renditions_dir(image.name)
+    with image.open('rb'), Image.open(image) as source:
+        source = source.convert('RGB')
+    widths = [
+        width for width in settings.RESPONSIVE_WIDTHS
+        if width <= source.width
+    ] or [min(settings.RESPONSIVE_WIDTHS)]
+    srcsets = {}
+    for width in widths:
+        picture = ImageOps.fit(
+            source, (width, round(width * card_height / card_width)),
+            Image.LANCZOS)
+        for image_format in ['JPEG', *supported_formats()]:
+            extension = 'jpg' if image_format == 'JPEG' else (
+                image_format.lower())
+            url = _save_variant(
+                picture, f'{directory}/{width}.{extension}', image_format)
+            srcsets.setdefault(image_format, []).append(f'{url} {width}w')
+    return {
+        'srcset': ', '.join(srcsets.pop('JPEG')),
+        'sources': [
+            {'type': Image.MIME[image_format], 'srcset': ', '.join(srcset)}
+            for image_format, srcset in srcsets.items()
+        ],
+    }
+
+
+def _cache_key(name):
+    options = json.dumps(settings.POST_RENDITIONS, sort_keys=True)
+    digest = hashlib.md5(f'{name}|{options}'.encode()).hexdigest()
+    return f'renditions:{digest}'
+
+
+def attach(posts):
+    """Копии для постов страницы, у которых они еще не сохранены.
+
+    Все копии читаются из кеша одним get_many; sorl вызывается только
+    для промахов, а результат кладется в кеш одним set_many. Картинку,
+    которую не удалось прочитать, тоже запоминаем, чтобы не пытаться
+    снова на каждом запросе.
+    """
+    pending = {}
+    for post in posts:
+        if post.image and not post.thumbnails:
+            pending.setdefault(_cache_key(post.image.name), []).append(post)
+    if not pending:
+        return
+    found = cache.get_many(list(pending))
+    missing = {}
+    for key, same_image in pending.items():
+        if key not in found:
+            try:
+                missing[key] = build(same_image[0].image)
+            except Exception:
+                logger.warning(
+                    'Не удалось построить копии %s', same_image[0].image.name)
+                missing[key] = {}
+            found[key] = missing[key]
+        for post in same_image:
+            post.thumbnails = found[key]
+    if missing:
+        cache.set_many(missing, settings.RENDITION_CACHE_TIMEOUT)
+
+
+def _shared(post):
+    """Готовое описание той же картинки у другого поста.
+
+    Хранилище раскладывает файлы по хешу содержимого, поэтому
+    повторная загрузка дает то же имя, и копии строить не нужно.
+    """
+    return Post.objects.filter(image=post.image.name).exclude(
+        pk=post.pk).exclude(renditions='').values(
+            'renditions', *EMPTY_META).first()
+
+
+def _generate(post_id):
+    post = Post.objects.only(
+        'image', 'author', 'group').filter(pk=post_id).first()
+    if post is None:
+        return
+    fields = {'renditions': '', **EMPTY_META}
+    if post.image:
+        fields = _shared(post) or {
+            **describe(post.image),
+            'renditions': json.dumps({
+                **build(post.image),
+                'responsive': build_responsive(post.image),
+            }),
+        }
+    # update() не отправляет post_save, ленты поста сбрасываются здесь.
+    if Post.objects.filter(
+            pk=post_id, image=post.image.name).update(**fields):
+        bump(post_feed(post_id),
+             *feed.post_feeds(post.author_id, post.group_id))
+
+
+def generate(post_id):
+    """Строит копии и описание картинки и сохраняет их,
+    если картинка поста за это время не сменилась."""
+    try:
+        _generate(post_id)
+    except Exception:
+        logger.exception(
+            'Не удалось построить копии картинки поста %s', post_id)
+
+
+@job(priority=5)
+def generate_later(post_id):
+    """То же в очереди: при ошибке задача повторяется."""
+    _generate(post_id)
+
+
+def save(post, changed_fields):
+    """Сохраняет пост из формы; копии новой картинки строятся в фоне."""
+    if 'image' not in changed_fields:
+        post.save()
+        return
+    post.renditions = ''
+    for field, value in EMPTY_META.items():
+        setattr(post, field, value)
+    post.save()
+    generate_later.delay(post.pk)
@@ -0,0 +1,174 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts (миграция 0019) хранит свою копию текста поста,
+в которой «ё» заменена на «е» (токенизатор unicode61 не снимает
+диакритику с кириллицы). Таблица индекса не ссылается на posts_post,
+поэтому миграции, пересоздающие posts_post, ее не ломают, но теряют
+триггеры (проверка posts.W001, команда rebuild_search_index). Триггеры
+на posts_post обновляют индекс в той же транзакции, что и пост.
+Результаты упорядочены по bm25, страницы листаются курсором (ранг, id),
+поэтому глубокие страницы не требуют OFFSET.
+"""
+import base64
+import binascii
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+from .utils import AFTER, CursorPaginator
+
+TABLE = 'posts_post_fts'
+NORMALIZED = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+CREATE_SQL = [
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    f"text, tokenize='unicode61 remove_diacritics 2')",
+    f'''CREATE TRIGGER IF NOT EXISTS {TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {TABLE}(rowid, text)
+        VALUES (new.id, {NORMALIZED.format("new.text")});
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS {TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        UPDATE {TABLE} SET text = {NORMALIZED.format("new.text")}
+        WHERE rowid = new.id;
+    END''',
+]
+
+FILL_SQL = [
+    f'DELETE FROM {TABLE}',
+    f'INSERT INTO {TABLE}(rowid, text) '
+    f'SELECT id, {NORMALIZED.format("text")} FROM posts_post',
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {TABLE}_update',
+    f'DROP TRIGGER IF EXISTS {TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {TABLE}_insert',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+WORD = re.compile(r'\w+')
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text):
+    """Запрос FTS5 из слов пользователя: все слова, по префиксу.
+
+    Операторы FTS5 из ввода не попадают в запрос: каждое слово
+    берется в кавычки.
+    """
+    words = WORD.findall(text.replace('ё', 'е').replace('Ё', 'Е'))
+    return ' '.join(f'"{word}"*' for word in words[:16])
+
+
+def create_schema(cursor):
+    for statement in CREATE_SQL:
+        cursor.execute(statement)
+
+
+def drop_schema(cursor):
+    for statement in DROP_SQL:
+        cursor.execute(statement)
+
+
+def rebuild():
+    """Перестраивает индекс по текущим постам.
+
+    Недостающие таблица, представление и триггеры создаются заново:
+    SQLite теряет триггеры, когда миграция пересоздает posts_post.
+    """
+    with connection.cursor() as cursor:
+        create_schema(cursor)
+        for statement in FILL_SQL:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def filter_posts(queryset, text):
+    """Посты из queryset, в которых есть все слова запроса."""
+    words = WORD.findall(text)
+    if not words:
+        return queryset.none()
+    if not available():
+        for word in words:
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    # Не pk__in=RawSQL(...): Django берет подзапрос во вторые скобки,
+    # и SQLite читает IN ((SELECT ...)) как одно значение — первую строку.
+    return queryset.extra(
+        where=[f'{Post._meta.db_table}.id IN '
+               f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'],
+        params=[match_query(text)])
+
+
+def encode_rank_cursor(rank, pk):
+    raw = f'{rank!r}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_rank_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        rank, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class SearchPaginator(CursorPaginator):
+    """Результаты поиска по bm25 с курсором (ранг, id).
+
+    Чем меньше ранг bm25, тем выше пост в выдаче.
+    """
+
+    def __init__(self, query, per_page):
+        self.query = query
+        super().__init__(Post.objects.none(), per_page)
+
+    def encode(self, key):
+        return encode_rank_cursor(*key)
+
+    def decode(self, token):
+        return decode_rank_cursor(token)
+
+    def fetch(self, cursor, direction, limit):
+        sql = f'SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s'
+        params = [self.query]
+        if cursor is not None:
+            rank, pk = cursor
+            sign = '>' if direction == AFTER else '<'
+            sql += f' AND (rank {sign} %s OR (rank = %s AND rowid {sign} %s))'
+            params += [rank, rank, pk]
+        order = '' if direction == AFTER else ' DESC'
+        sql += f' ORDER BY rank{order}, rowid{order} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as db:
+            db.execute(sql, params)
+            rows = db.fetchall()
+        posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+        return [
+            ((rank, pk), posts[pk]) for pk, rank in rows if pk in posts
+        ]
+
+    def legacy_cursor(self, number):
+        return None
+
+
+def search_paginator(text):
+    """Пагинатор результатов: по bm25 на SQLite, иначе по дате."""
+    if available() and match_query(text):
+        return SearchPaginator(match_query(text), settings.AMOUNT_POSTS)
+    return CursorPaginator(
+        filter_posts(Post.objects.for_feed(), text), settings.AMOUNT_POSTS)
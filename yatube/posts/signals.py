@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, events, feed, media
+from .cache import (INDEX, bump, follow_feed, group_feed, post_feed,
+                    profile_feed)
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    instance._loaded_image = instance.__dict__.get('image')
+
+
+def release_image(name):
+    """После коммита удаляет файл, если постов с ним не осталось."""
+    name = str(name or '')
+    if name and settings.MEDIA_DELETE_ON_RELEASE:
+        transaction.on_commit(lambda: media.release(name))
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, raw=False, **kwargs):
+    current = instance.__dict__.get('image')
+    if not (created or raw or current is None):
+        if str(instance._loaded_image or '') != str(current or ''):
+            release_image(instance._loaded_image)
+    instance._loaded_image = current
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.__dict__.get('image'))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def announce_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        channels = [INDEX, profile_feed(instance.author_id)]
+        transaction.on_commit(
+            lambda: events.broker.publish(channels, instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        counters.post_saved(instance, created, instance._loaded_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+
+
+# Должен подключаться последним: запоминает новую группу поста.
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump(post_feed(instance.pk), *feed.post_feeds(
+        instance.author_id, instance.group_id, instance._loaded_group_id))
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group_id').first()
+    if post is not None:
+        bump(post_feed(instance.post_id),
+             *feed.post_feeds(post['author_id'], post['group_id']))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_feeds(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump(INDEX, group_feed(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.update_pulled(instance.author_id)
+        feed.backfill(instance.user_id, instance.author_id)
+        bump(follow_feed(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def prune_follow(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+    bump(follow_feed(instance.user_id))
+    feed.update_pulled(instance.author_id)
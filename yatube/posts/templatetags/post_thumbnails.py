@@ -0,0 +1,12 @@
+from django import template
+
+from posts import renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def attach_thumbnails(posts):
+    """Готовит копии картинок сразу для всех постов страницы."""
+    renditions.attach(posts)
+    return ''
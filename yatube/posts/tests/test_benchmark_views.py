@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class BenchmarkViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='BenchAuthor')
+        cls.reader = User.objects.create(username='BenchReader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='bench', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.output = os.path.join(directory, 'bench.json')
+        self.addCleanup(
+            lambda: os.path.exists(self.output) and os.remove(self.output))
+
+    def benchmark(self, **options):
+        # С прогретым кешем страницы гостей отдаются без запросов к базе.
+        call_command(
+            'benchmark_views', requests=3, warmup=1, cold=True,
+            stdout=StringIO(), **options)
+
+    def test_reports_every_view(self):
+        """Для каждой страницы записываются перцентили и число запросов."""
+        self.benchmark(output=self.output)
+        with open(self.output) as output:
+            results = json.load(output)
+        self.assertEqual(set(results['views']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'add_comment'})
+        for view, stats in results['views'].items():
+            with self.subTest(view=view):
+                self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+                self.assertGreater(stats['queries'], 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_regression_over_threshold_fails(self):
+        """Рост метрик сверх порога относительно baseline — ошибка."""
+        with open(self.output, 'w') as baseline:
+            json.dump({'views': {'index': {'queries': 0.1}}}, baseline)
+        with self.assertRaisesMessage(CommandError, 'index.queries'):
+            self.benchmark(views=['index'], baseline=self.output)
@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Group, Post, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestCounterAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='counter-slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа2',
+            slug='counter-slug2',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CountersTests.user)
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=CountersTests.user,
+            group=CountersTests.group,
+        )
+
+    def assertCounters(self, author_posts, group_posts, group2_posts=0):
+        self.assertEqual(
+            AuthorStats.objects.get(author=CountersTests.user).posts_count,
+            author_posts)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group.pk).posts_count,
+            group_posts)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group2.pk).posts_count,
+            group2_posts)
+
+    def test_post_create_increments_counters(self):
+        self.assertCounters(1, 1)
+        Post.objects.create(text='Еще пост', author=CountersTests.user)
+        self.assertCounters(2, 1)
+
+    def test_group_change_moves_counter(self):
+        """Смена группы при редактировании переносит счетчик."""
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            data={'text': 'Новый текст', 'group': CountersTests.group2.pk})
+        self.assertCounters(1, 0, 1)
+
+    def test_full_save_keeps_counters(self):
+        """Сохранение прочитанных раньше экземпляров (форма, админка)
+        не возвращает старые значения счетчиков."""
+        post = Post.objects.get(pk=self.post.pk)
+        group = Group.objects.get(pk=CountersTests.group.pk)
+        stats = AuthorStats.objects.get(author=CountersTests.user)
+        Comment.objects.create(
+            post=self.post, author=CountersTests.user, text='Комментарий')
+        Post.objects.create(
+            text='Еще пост', author=CountersTests.user,
+            group=CountersTests.group)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            data={'text': 'Новый текст', 'group': CountersTests.group.pk})
+        post.text = 'Текст из админки'
+        post.save()
+        group.title = 'Новое название'
+        group.save()
+        stats.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Текст из админки')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group.pk).title,
+            'Новое название')
+        self.assertCounters(2, 2)
+
+    def test_comments_count(self):
+        comment = Comment.objects.create(
+            post=self.post, author=CountersTests.user, text='Комментарий')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_delete_view_decrements_counters(self):
+        """Удаление поста через PostDeleteView уменьшает счетчики."""
+        Comment.objects.create(
+            post=self.post, author=CountersTests.user, text='Комментарий')
+        self.authorized_client.post(
+            reverse('posts:post_delete', args=[self.post.pk]))
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertCounters(0, 0)
+
+    def test_author_deleted_with_posts(self):
+        """Удаление автора с постами и комментариями не оставляет
+        счетчиков без автора."""
+        reader = User.objects.create(username='TestCounterReader')
+        Comment.objects.create(
+            post=self.post, author=reader, text='Комментарий')
+        Comment.objects.create(
+            post=self.post, author=CountersTests.user, text='Свой')
+        Post.objects.create(text='Еще пост', author=CountersTests.user)
+        User.objects.filter(pk=CountersTests.user.pk).delete()
+        connection.check_constraints()
+        self.assertFalse(AuthorStats.objects.exists())
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group.pk).posts_count, 0)
+
+    def test_pages_use_counters(self):
+        """Профиль и пост показывают число постов без COUNT(*)."""
+        pages = (
+            reverse('posts:profile', args=[CountersTests.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['posts_amount'], 1)
+
+    def test_recount_repairs_drift(self):
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        Group.objects.filter(pk=CountersTests.group.pk).update(posts_count=7)
+        AuthorStats.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertCounters(1, 1)
@@ -0,0 +1,155 @@
+import asyncio
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+from core.management.commands.benchmark_asgi import scope
+
+from .. import events
+from ..models import Follow, Post, User
+
+
+async def asgi_get(application, url, started, leave):
+    """GET через ASGI-вход; клиент уходит, когда выставлено leave.
+
+    В started попадает код ответа, когда пришла первая часть тела.
+    """
+    messages = [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await leave.wait()
+        return {'type': 'http.disconnect'}
+
+    status = []
+
+    async def send(message):
+        # Место потока занимается с началом отдачи тела.
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif not started.done():
+            started.set_result(status[0])
+
+    await application(scope(url), receive, send)
+
+
+@override_settings(SSE_HEARTBEAT=0.05, SSE_STREAM_TIMEOUT=5)
+class NewPostsEventsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='TestEventsAuthor')
+        self.other = User.objects.create(username='TestEventsOther')
+        self.reader = User.objects.create(username='TestEventsReader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.latest = Post.objects.create(text='Старый', author=self.author)
+        self.client = Client()
+
+    def open(self, url, client=None):
+        response = (client or self.client).get(
+            url, {'since': self.latest.pk})
+        self.addCleanup(response.close)
+        return response, iter(response.streaming_content)
+
+    def next_event(self, stream):
+        """Следующее событие, пропуская пинги."""
+        while True:
+            chunk = next(stream).decode()
+            if chunk.startswith('event:'):
+                return chunk
+
+    def test_index_stream_counts_new_posts(self):
+        """Новый пост сразу приходит событием с числом новых постов."""
+        response, stream = self.open(reverse('posts:index_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(next(stream).startswith(b'retry: '))
+        self.assertEqual(
+            self.next_event(stream), 'event: posts\ndata: {"count": 0}\n\n')
+        Post.objects.create(text='Новый', author=self.other)
+        self.assertEqual(
+            self.next_event(stream), 'event: posts\ndata: {"count": 1}\n\n')
+
+    def test_follow_stream_only_followed_authors(self):
+        """Лента подписок считает только посты своих авторов."""
+        client = Client()
+        client.force_login(self.reader)
+        _, stream = self.open(reverse('posts:follow_events'), client)
+        self.assertIn('"count": 0', self.next_event(stream))
+        Post.objects.create(text='Чужой', author=self.other)
+        Post.objects.create(text='Свой', author=self.author)
+        self.assertIn('"count": 1', self.next_event(stream))
+
+    def test_heartbeat_sent_while_idle(self):
+        """Пока постов нет, поток шлет пинги."""
+        _, stream = self.open(reverse('posts:index_events'))
+        self.next_event(stream)
+        self.assertEqual(next(stream), b': ping\n\n')
+
+    @override_settings(SSE_MAX_STREAMS=1)
+    def test_streams_capped(self):
+        """Сверх SSE_MAX_STREAMS отвечает 503, закрытый поток освобождает
+        место."""
+        first, stream = self.open(reverse('posts:index_events'))
+        next(stream)
+        response = self.client.get(reverse('posts:index_events'))
+        self.assertEqual(response.status_code, 503)
+        first.close()
+        self.assertEqual(events.slots.active, 0)
+        self.assertFalse(events.broker.channels)
+        second, _ = self.open(reverse('posts:index_events'))
+        self.assertEqual(second.status_code, 200)
+
+    @override_settings(SSE_MAX_STREAMS=1)
+    def test_dropped_response_holds_no_slot(self):
+        """Ответ, который сервер не начал отдавать и бросил без close(),
+        не занимает места и не держит подписку."""
+        response = self.client.get(reverse('posts:index_events'))
+        self.assertEqual(response.status_code, 200)
+        del response
+        self.assertEqual(events.slots.active, 0)
+        self.assertFalse(events.broker.channels)
+        second, stream = self.open(reverse('posts:index_events'))
+        self.assertTrue(next(stream).startswith(b'retry: '))
+        self.assertEqual(events.slots.active, 1)
+
+    def test_feed_page_subscribes_to_stream(self):
+        """Первая страница ленты подписывается на поток событий."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            f'data-stream="{reverse("posts:index_events")}'
+            f'?since={self.latest.pk}"')
+
+    @override_settings(
+        SSE_MAX_STREAMS=3, ASGI_THREADS=2, ASGI_STREAM_THREADS=4)
+    def test_page_served_while_streams_open(self):
+        """Открытые через ASGI-вход потоки не занимают пул страниц."""
+        application = ASGIHandler(WSGIHandler())
+        url = f'{reverse("posts:index_events")}?since={self.latest.pk}'
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            leave = asyncio.Event()
+            started = [loop.create_future() for _ in range(4)]
+            streams = [
+                asyncio.ensure_future(
+                    asgi_get(application, url, future, leave))
+                for future in started[:3]]
+            try:
+                statuses = await asyncio.wait_for(
+                    asyncio.gather(*started[:3]), 5)
+                self.assertEqual(statuses, [200] * 3)
+                self.assertEqual(events.slots.active, 3)
+                page = asyncio.ensure_future(asgi_get(
+                    application, reverse('about:author'), started[3], leave))
+                self.assertEqual(await asyncio.wait_for(started[3], 5), 200)
+            finally:
+                leave.set()
+                await asyncio.wait_for(asyncio.gather(*streams), 5)
+            await page
+
+        asyncio.run(main())
+        self.assertEqual(events.slots.active, 0)
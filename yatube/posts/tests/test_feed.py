@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Job
+
+from .. import feed
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='TestReader')
+        cls.author = User.objects.create(username='TestFeedAuthor')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FollowFeedTests.reader)
+
+    def follow(self):
+        self.reader_client.get(reverse(
+            'posts:profile_follow', args=[FollowFeedTests.author.username]))
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_inbox(self):
+        """Подписка добавляет во входящие старые посты автора."""
+        self.follow()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedTests.reader,
+            post=FollowFeedTests.old_post).exists())
+        self.assertEqual(self.feed(), [FollowFeedTests.old_post])
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается во входящие подписчиков."""
+        self.follow()
+        post = Post.objects.create(
+            text='Пост после подписки', author=FollowFeedTests.author)
+        self.assertEqual(self.feed(), [post, FollowFeedTests.old_post])
+
+    def test_unfollow_prunes_inbox(self):
+        """Отписка убирает посты автора из входящих."""
+        self.follow()
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', args=[FollowFeedTests.author.username]))
+        self.assertFalse(
+            FeedEntry.objects.filter(user=FollowFeedTests.reader).exists())
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_pulled_author_is_merged_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(
+            user=FollowFeedTests.reader, author=FollowFeedTests.author)
+        cache.clear()
+        post = Post.objects.create(
+            text='Пост популярного автора', author=FollowFeedTests.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, FollowFeedTests.old_post])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1, JOBS_RUN_INLINE=False)
+    def test_author_no_longer_pulled_fills_inboxes(self):
+        """Когда подписчиков становится не больше предела, посты автора
+        попадают во входящие подписчиков из фоновой задачи."""
+        other = User.objects.create(username='TestOtherReader')
+        Follow.objects.create(
+            user=FollowFeedTests.reader, author=FollowFeedTests.author)
+        Follow.objects.create(user=other, author=FollowFeedTests.author)
+        self.assertTrue(feed.is_pulled(FollowFeedTests.author.pk))
+        post = Post.objects.create(
+            text='Пост популярного автора', author=FollowFeedTests.author)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertFalse(feed.is_pulled(FollowFeedTests.author.pk))
+        self.assertEqual(
+            Job.objects.get().name, 'posts.feed.backfill_followers')
+        call_command('run_workers', once=True, stdout=StringIO())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=FollowFeedTests.reader, post=post).exists())
+        self.assertEqual(self.feed(), [post, FollowFeedTests.old_post])
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_recount_fixes_pulled_flags(self):
+        """recount сверяет флаги «тяжелых» авторов с подписками."""
+        other = User.objects.create(username='TestOtherReader')
+        Follow.objects.bulk_create([
+            Follow(user=FollowFeedTests.reader, author=FollowFeedTests.author),
+            Follow(user=other, author=FollowFeedTests.author),
+        ])
+        self.assertFalse(feed.is_pulled(FollowFeedTests.author.pk))
+        output = StringIO()
+        call_command('recount', stdout=output)
+        self.assertIn('pulled: исправлено 1', output.getvalue())
+        self.assertTrue(feed.is_pulled(FollowFeedTests.author.pk))
+
+    def test_rebuild_feeds_command(self):
+        """Команда rebuild_feeds восстанавливает входящие."""
+        self.follow()
+        FeedEntry.objects.all().delete()
+        call_command(
+            'rebuild_feeds', FollowFeedTests.reader.username,
+            stdout=StringIO())
+        self.assertEqual(self.feed(), [FollowFeedTests.old_post])
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
@@ -8,6 +9,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.storage import ContentAddressedStorage
+
 from ..forms import CommentForm, PostForm
 from ..models import Comment, Group, Post, User
 
@@ -78,7 +81,8 @@ class PostCreateFormTests(TestCase):
                 text='Тестовый пост для формы',
                 author=PostCreateFormTests.user,
                 group=PostCreateFormTests.group.pk,
-                image='posts/small.gif',
+                image=ContentAddressedStorage.hashed_name(
+                    'posts', hashlib.sha256(small_gif).hexdigest(), '.gif'),
             ).exists()
         )
         self.assertEqual(response.status_code, HTTPStatus.OK)
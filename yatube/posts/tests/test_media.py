@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, User
+from .test_renditions import image_file
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def media_files():
+    return sorted(
+        os.path.relpath(os.path.join(root, name), TEMP_MEDIA_ROOT)
+        for root, _, names in os.walk(TEMP_MEDIA_ROOT) for name in names)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_RUN_INLINE=True)
+class GarbageCollectorTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create(username='TestMedia')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, text='Пост с картинкой', size=(120, 80)):
+        self.client.post(reverse('posts:post_create'), {
+            'text': text, 'image': image_file(size=size)})
+        return Post.objects.get(text=text)
+
+    def gc_media(self, *args):
+        output = StringIO()
+        call_command('gc_media', '--grace=0', *args, stdout=output)
+        return output.getvalue()
+
+    def test_deleted_post_files_collected(self):
+        """Команда удаляет оригинал и все копии удаленного поста."""
+        kept = self.create_post('Остается', size=(100, 50))
+        before = media_files()
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).delete()
+        output = self.gc_media()
+        self.assertEqual(media_files(), before)
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertNotIn('освобождено байт: 0', output)
+
+    def test_dry_run_keeps_files(self):
+        """С --dry-run файлы только подсчитываются."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).delete()
+        files = media_files()
+        output = self.gc_media('--dry-run')
+        self.assertEqual(media_files(), files)
+        self.assertIn('Будет удалено', output)
+
+    def test_shared_image_kept_while_referenced(self):
+        """Общий файл живет, пока на него ссылается хотя бы один пост."""
+        first = self.create_post()
+        self.create_post('Тот же файл')
+        files = media_files()
+        Post.objects.filter(pk=first.pk).delete()
+        self.gc_media()
+        self.assertEqual(media_files(), files)
+
+    def test_recent_files_skipped(self):
+        """Свежие файлы не удаляются: пост еще может быть не сохранен."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).delete()
+        files = media_files()
+        call_command('gc_media', stdout=StringIO())
+        self.assertEqual(media_files(), files)
+
+    def test_reuploaded_old_file_kept(self):
+        """Повторная загрузка старого файла защищает его от --grace."""
+        storage = Post._meta.get_field('image').storage
+        name = storage.save('posts/first.gif', image_file())
+        old = time.time() - 2 * 60 * 60
+        os.utime(storage.path(name), (old, old))
+        self.assertEqual(
+            storage.save('posts/second.gif', image_file()), name)
+        call_command('gc_media', '--grace=3600', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+
+    def test_unknown_thumbnail_collected(self):
+        """Миниатюра без записи в хранилище ключей sorl удаляется."""
+        self.create_post()
+        files = media_files()
+        stray = os.path.join(TEMP_MEDIA_ROOT, 'cache', 'ab', 'stray.jpg')
+        os.makedirs(os.path.dirname(stray))
+        with open(stray, 'wb') as output:
+            output.write(b'jpeg')
+        self.gc_media()
+        self.assertEqual(media_files(), files)
+
+    @override_settings(MEDIA_DELETE_ON_RELEASE=True, MEDIA_GC_GRACE=0)
+    def test_delete_releases_files(self):
+        """С MEDIA_DELETE_ON_RELEASE файлы удаляются вместе с постом."""
+        before = media_files()
+        post = self.create_post()
+        self.client.post(reverse('posts:post_delete', args=[post.pk]))
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertEqual(media_files(), before)
+
+    @override_settings(MEDIA_DELETE_ON_RELEASE=True)
+    def test_release_keeps_recent_file(self):
+        """Свежий файл не удаляется сразу: его могла взять загрузка
+        того же содержимого, чей пост еще не закоммичен."""
+        post = self.create_post()
+        files = media_files()
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(media_files(), files)
+        self.assertTrue(os.path.exists(post.image.path))
+
+    @override_settings(MEDIA_DELETE_ON_RELEASE=True, MEDIA_GC_GRACE=0)
+    def test_replaced_image_released(self):
+        """Замена картинки удаляет старый файл и его копии."""
+        post = self.create_post()
+        old_name = post.image.name
+        self.client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': post.text, 'image': image_file(size=(100, 50))})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(any(
+            old_name in name for name in media_files()))
+        self.assertTrue(os.path.exists(post.image.path))
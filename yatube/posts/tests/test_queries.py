@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class FeedQueryBudgetTests(TestCase):
+    """Число запросов страниц со списками не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='TestBudgetReader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='budget-slug',
+            description='Тестовое описание',
+        )
+        for i in range(3):
+            author = User.objects.create(
+                username=f'TestBudgetAuthor{i}',
+                first_name='Имя',
+                last_name=f'Фамилия{i}',
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+            for j in range(4):
+                post = Post.objects.create(
+                    text=f'Тестовый текст {i} {j}',
+                    author=author,
+                    group=cls.group,
+                )
+                Comment.objects.create(
+                    post=post, author=cls.reader, text='Комментарий')
+        cls.author = author
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(FeedQueryBudgetTests.reader)
+
+    def test_guest_pages_query_budget(self):
+        """Гостевые страницы укладываются в бюджет запросов.
+
+        Первый запрос строит страницу; группа, автор и пост ищутся еще
+        раз для ключа кеша страницы. Повторный запрос отдается из кеша.
+        Версии лент читаются одним запросом.
+        """
+        budgets = (
+            (reverse('posts:index'), 2, 1),
+            (reverse('posts:group_list',
+                     args=[FeedQueryBudgetTests.group.slug]), 4, 2),
+            (reverse('posts:profile',
+                     args=[FeedQueryBudgetTests.author.username]), 4, 2),
+            (reverse('posts:post_detail',
+                     args=[FeedQueryBudgetTests.post.pk]), 4, 2),
+        )
+        for url, budget, cached_budget in budgets:
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.client.get(url)
+                with self.assertNumQueries(cached_budget):
+                    response = self.client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_follow_index_query_budget(self):
+        """Лента подписок: сессия, пользователь, список популярных авторов,
+        версии лент, входящие и посты."""
+        with self.assertNumQueries(6):
+            response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_feed_posts_have_comments_count(self):
+        response = self.client.get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertEqual(post.comments_count, 1)
+        self.assertContains(response, 'Комментариев: 1')
@@ -0,0 +1,96 @@
+import re
+import unittest
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN')
+class QueryPlanTests(TestCase):
+    """Основные запросы страниц идут по индексам: без полного скана
+    таблиц приложения и без сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='TestPlanReader')
+        cls.author = User.objects.create(username='TestPlanAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='plan-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый текст {i}',
+                author=cls.author,
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryPlanTests.reader)
+
+    def plans(self, url):
+        """Планы всех запросов к таблицам posts_ при открытии url."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans.append((sql, [row[3] for row in cursor.fetchall()]))
+        return response, plans
+
+    def assertIndexedPlans(self, url):
+        response, plans = self.plans(url)
+        self.assertTrue(plans)
+        for sql, details in plans:
+            for detail in details:
+                with self.subTest(url=url, sql=sql, detail=detail):
+                    self.assertNotRegex(detail, FULL_SCAN)
+                    self.assertNotIn(TEMP_SORT, detail)
+        return response
+
+    def test_feed_plans(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[QueryPlanTests.group.slug]),
+            reverse('posts:profile', args=[QueryPlanTests.author.username]),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            response = self.assertIndexedPlans(url)
+            cursor = response.context['page_obj'].next_cursor
+            self.assertIndexedPlans(f'{url}?after={cursor}')
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_pulled_follow_feed_plans(self):
+        other = User.objects.create(username='TestPlanOtherAuthor')
+        Post.objects.create(text='Другой пост', author=other)
+        Follow.objects.create(user=QueryPlanTests.reader, author=other)
+        cache.clear()
+        url = reverse('posts:follow_index')
+        response = self.assertIndexedPlans(url)
+        cursor = response.context['page_obj'].next_cursor
+        self.assertIndexedPlans(f'{url}?after={cursor}')
+
+    def test_post_detail_plans(self):
+        self.assertIndexedPlans(
+            reverse('posts:post_detail', args=[QueryPlanTests.post.pk]))
@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from ..cache import INDEX, bump, post_feed, profile_feed, versions
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_file(name='image.png', size=(120, 80)):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 20, 20)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_RUN_INLINE=True)
+class RenditionsTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='TestRenditions')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой', 'image': image_file()})
+        return Post.objects.get(author=self.user)
+
+    def test_upload_builds_renditions(self):
+        """После загрузки картинки копии строятся и сохраняются в посте."""
+        card = self.create_post().thumbnails['card']
+        self.assertEqual((card['width'], card['height']), (960, 339))
+        self.assertTrue(card['url'].startswith(settings.MEDIA_URL))
+
+    def test_feed_uses_stored_renditions(self):
+        """Лента выводит сохраненные адреса без обращений к sorl."""
+        card = self.create_post().thumbnails['card']
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, card['url'])
+        self.assertFalse(any(
+            'thumbnail_kvstore' in query['sql']
+            for query in queries.captured_queries))
+
+    def test_upload_builds_responsive_variants(self):
+        """Адаптивные копии строятся нужных ширин и попадают в srcset."""
+        responsive = self.create_post().thumbnails['responsive']
+        self.assertIn(' 320w', responsive['srcset'])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, responsive['srcset'])
+
+    @override_settings(RESPONSIVE_FORMATS=('PNG', 'NOSUCHFORMAT'))
+    def test_only_supported_formats_become_sources(self):
+        """Форматы, которые Pillow не умеет сохранять, пропускаются."""
+        sources = self.create_post().thumbnails['responsive']['sources']
+        self.assertEqual([source['type'] for source in sources],
+                         ['image/png'])
+        self.assertIn('.png 320w', sources[0]['srcset'])
+
+    def test_upload_describes_image(self):
+        """Размеры, цвет и заглушка картинки сохраняются в посте."""
+        post = self.create_post()
+        self.assertEqual((post.image_width, post.image_height), (120, 80))
+        self.assertEqual(post.image_color, '#c81414')
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, post.image_placeholder)
+
+    def test_backfill_describes_existing_images(self):
+        """Команда заполняет описание картинок старых постов."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(
+            image_width=None, image_height=None)
+        call_command('backfill_image_meta', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (120, 80))
+
+    def test_duplicate_upload_shares_file_and_renditions(self):
+        """Повторная загрузка той же картинки не создает новых файлов."""
+        first = self.create_post()
+        files = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(TEMP_MEDIA_ROOT) for name in names)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Тот же файл', 'image': image_file('copy.png')})
+        second = Post.objects.get(text='Тот же файл')
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.renditions, first.renditions)
+        self.assertEqual(sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(TEMP_MEDIA_ROOT)
+            for name in names), files)
+
+    def test_generate_bumps_post_feeds(self):
+        """Сохранение копий через update() сбрасывает кеш лент поста."""
+        post = self.create_post()
+        feeds = (INDEX, profile_feed(self.user.pk), post_feed(post.pk))
+        before = versions(*feeds)
+        call_command('build_renditions', stdout=StringIO())
+        self.assertEqual(versions(*feeds), before)
+        Post.objects.filter(pk=post.pk).update(renditions='')
+        call_command('build_renditions', stdout=StringIO())
+        for name, old, new in zip(feeds, before, versions(*feeds)):
+            with self.subTest(feed=name):
+                self.assertNotEqual(new, old)
+
+    def test_edit_without_new_image_keeps_renditions(self):
+        """Правка текста не сбрасывает готовые копии."""
+        post = self.create_post()
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Новый текст'})
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertIn('card', post.thumbnails)
+
+    def test_command_builds_missing_renditions(self):
+        """Команда строит копии для постов, сохраненных в обход формы."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(renditions='')
+        call_command('build_renditions', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertIn('card', post.thumbnails)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AttachThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestAttach')
+        for number in range(3):
+            name = default_storage.save(
+                f'posts/attach_{number}.png',
+                ContentFile(image_file().read()))
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.user, image=name,
+                image_width=120, image_height=80)
+        Post.objects.create(
+            text='Пост без файла', author=cls.user, image='posts/lost.png')
+
+    def setUp(self):
+        cache.clear()
+
+    def kvstore_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']]
+
+    def test_page_thumbnails_resolved_from_one_cache_read(self):
+        """Повторный рендер страницы не обращается к хранилищу sorl."""
+        self.kvstore_queries()
+        bump(INDEX)
+        response, queries = self.kvstore_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.content.count(b'width="960"'), 3)
+
+    def test_unreadable_image_rendered_without_size(self):
+        """Пост с нечитаемой картинкой рендерится без width и height."""
+        with self.assertLogs('sorl.thumbnail', 'ERROR'):
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Пост без файла')
+        self.assertEqual(response.content.count(b'height="339"'), 3)
@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import checks, search
+from ..models import Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='TestSearch')
+
+    def setUp(self):
+        self.client = Client()
+
+    def create(self, text):
+        return Post.objects.create(text=text, author=SearchTests.author)
+
+    def found(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj']), response
+
+    def test_results_ranked_by_relevance(self):
+        """Пост, где слово встречается чаще, выше в выдаче."""
+        once = self.create('Котики и собаки гуляют в парке весь день')
+        often = self.create('Котики, котики, снова котики')
+        self.create('Пост без нужного слова')
+        posts, _ = self.found('котики')
+        self.assertEqual(posts, [often, once])
+
+    def test_prefix_and_yo_folding(self):
+        """Ищется по началу слова, «ё» и «е» не различаются."""
+        post = self.create('Ёжик в тумане')
+        self.assertEqual(self.found('ежи')[0], [post])
+        self.assertEqual(self.found('ТУМАН')[0], [post])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Триггеры обновляют индекс при правке и удалении поста."""
+        post = self.create('Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.found('старый')[0], [])
+        self.assertEqual(self.found('новый')[0], [post])
+        post.delete()
+        self.assertEqual(self.found('новый')[0], [])
+
+    def test_operators_are_plain_words(self):
+        """Синтаксис FTS5 в запросе не ломает поиск."""
+        post = self.create('Запрос NOT пустой')
+        self.assertEqual(self.found('"запрос" NOT (')[0], [post])
+        self.assertEqual(self.found('*** ')[0], [])
+
+    @override_settings(AMOUNT_POSTS=3)
+    def test_cursor_pages_keep_query(self):
+        """Страницы листаются курсором и сохраняют запрос в ссылках."""
+        posts = [self.create(f'Поиск номер {number}') for number in range(7)]
+        self.create('Другой пост')
+        seen, params = [], {}
+        while True:
+            page, response = self.found('поиск', **params)
+            seen += page
+            if not response.context['page_obj'].has_next():
+                break
+            self.assertContains(response, '?q=%D0%BF%D0%BE%D0%B8%D1%81%D0%BA&')
+            params = {'after': response.context['page_obj'].next_cursor}
+        self.assertCountEqual(seen, posts)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по тому же индексу."""
+        post = self.create('Ёлка в админке')
+        self.create('Другой пост')
+        admin = get_user_model().objects.create_superuser(
+            'TestSearchAdmin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'елка'})
+        self.assertEqual(list(response.context['cl'].result_list), [post])
+
+    def test_rebuild_restores_triggers(self):
+        """Команда восстанавливает триггеры и переиндексирует посты."""
+        self.assertEqual(checks.search_triggers(None), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.TABLE}_insert')
+        warnings = checks.search_triggers(None)
+        self.assertEqual([warning.id for warning in warnings], ['posts.W001'])
+        self.assertIn(f'{search.TABLE}_insert', warnings[0].msg)
+        post = self.create('Пост без триггера')
+        self.assertEqual(self.found('триггера')[0], [])
+        output = StringIO()
+        call_command('rebuild_search_index', stdout=output)
+        self.assertIn('Проиндексировано постов: 1', output.getvalue())
+        self.assertEqual(self.found('триггера')[0], [post])
+        self.assertEqual(self.found('без')[0], [post])
+        self.assertEqual(checks.search_triggers(None), [])
+
+
+class SearchSchemaTests(TransactionTestCase):
+    def test_post_table_rebuild_keeps_index(self):
+        """Миграция, пересоздающая posts_post, не ломается об индекс."""
+        if not search.available():
+            self.skipTest('Индекс есть только в SQLite')
+        author = User.objects.create(username='TestSearchSchema')
+        Post.objects.create(text='Пост до миграции', author=author)
+        before = MigrationLoader(connection).project_state()
+        after = before.clone()
+        # На SQLite добавление поля пересоздает таблицу posts_post.
+        operation = migrations.AddField(
+            'post', 'probe', models.IntegerField(default=0))
+        operation.state_forwards('posts', after)
+        self.addCleanup(search.rebuild)
+        with connection.schema_editor() as editor:
+            operation.database_forwards('posts', editor, before, after)
+        with connection.schema_editor() as editor:
+            operation.database_backwards('posts', editor, after, before)
+        self.assertEqual(
+            [warning.id for warning in checks.search_triggers(None)],
+            ['posts.W001'])
+        search.rebuild()
+        self.assertEqual(checks.search_triggers(None), [])
+        post = Post.objects.create(text='Пост после миграции', author=author)
+        self.assertEqual(
+            list(search.filter_posts(Post.objects.all(), 'миграции')
+                 .order_by('pk')),
+            [Post.objects.get(text='Пост до миграции'), post])
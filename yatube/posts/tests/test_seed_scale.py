@@ -0,0 +1,70 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from posts import counters, feed
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedScaleTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def seed(self, prefix, seed=1):
+        call_command(
+            'seed_scale', users=30, groups=3, posts=200, comments=300,
+            follows=60, images=2, seed=seed, prefix=prefix,
+            batch_size=50, stdout=StringIO())
+        return list(Post.objects.filter(
+            author__username__startswith=f'{prefix}_'
+        ).order_by('pk').values_list('text', 'author__username'))
+
+    def test_seed_creates_requested_amounts(self):
+        """Команда создает заданное число объектов всех видов."""
+        self.seed('load')
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+    def test_seed_keeps_counters_and_feeds_consistent(self):
+        """После заполнения счетчики верны, а ленты подписок собраны."""
+        self.seed('load')
+        self.assertEqual(
+            counters.recount(), {'posts': 0, 'groups': 0, 'authors': 0})
+        seeded = set(FeedEntry.objects.values_list('user', 'post'))
+        self.assertTrue(seeded)
+        for user_id in Follow.objects.values_list('user', flat=True):
+            feed.rebuild(user_id)
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('user', 'post')), seeded)
+
+    def test_seed_is_deterministic(self):
+        """Одинаковый seed дает одинаковые данные."""
+        first = self.seed('first')
+        second = self.seed('second')
+        self.assertEqual(
+            [(text, name.split('_')[1]) for text, name in first],
+            [(text, name.split('_')[1]) for text, name in second])
+
+    def test_seed_distributes_authors_by_power_law(self):
+        """Самый популярный автор пишет намного больше медианного."""
+        self.seed('load')
+        amounts = sorted(
+            Post.objects.order_by().values('author').annotate(
+                count=Count('pk')).values_list('count', flat=True),
+            reverse=True)
+        self.assertGreater(amounts[0], amounts[len(amounts) // 2] * 5)
@@ -0,0 +1,69 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post, User
+
+
+def upload(image_format='PNG', size=(120, 80), **params):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 20, 20)).save(buffer, image_format, **params)
+    extension = image_format.lower()
+    return SimpleUploadedFile(
+        f'image.{extension}', buffer.getvalue(), f'image/{extension}')
+
+
+class UploadLimitsTests(TestCase):
+    def clean_image(self, image):
+        form = PostForm({'text': 'Пост'}, {'image': image})
+        self.assertTrue(form.is_valid(), form.errors)
+        return Image.open(form.cleaned_data['image'])
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=100)
+    def test_oversized_upload_rejected_while_streaming(self):
+        """Файл сверх лимита не дочитывается, а форма его отклоняет."""
+        user = User.objects.create(username='TestUploads')
+        client = Client()
+        client.force_login(user)
+        response = client.post(reverse('posts:post_create'), {
+            'text': 'Большой файл', 'image': upload()})
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 100\xa0байт.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_rejected_by_header(self):
+        """Картинка с лишними пикселями отклоняется по заголовку."""
+        form = PostForm({'text': 'Пост'}, {'image': upload()})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors['image'], ['Картинка больше 0.001 мегапикселей.'])
+
+    @override_settings(IMAGE_MAX_SIDE=60)
+    def test_large_image_downscaled(self):
+        """Стороны больше IMAGE_MAX_SIDE уменьшаются с сохранением формата."""
+        picture = self.clean_image(upload('JPEG'))
+        self.assertEqual((picture.format, picture.size), ('JPEG', (60, 40)))
+
+    def test_exif_removed_and_orientation_applied(self):
+        """EXIF удаляется, а поворот из него применяется к пикселям."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010f] = 'Camera'
+        picture = self.clean_image(upload('JPEG', exif=exif.tobytes()))
+        self.assertEqual(picture.size, (80, 120))
+        self.assertFalse(picture.getexif())
+
+    def test_clean_image_kept_as_is(self):
+        """Картинка в пределах лимитов и без EXIF не перекодируется."""
+        image = upload()
+        content = image.read()
+        image.seek(0)
+        form = PostForm({'text': 'Пост'}, {'image': image})
+        self.assertTrue(form.is_valid())
+        form.cleaned_data['image'].seek(0)
+        self.assertEqual(form.cleaned_data['image'].read(), content)
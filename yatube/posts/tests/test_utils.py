@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from ..models import Group, Post
@@ -26,7 +28,7 @@ class PaginatorViewsTest(TestCase):
             )
 
     def setUp(self):
-        cache.close()
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user)
 
@@ -51,3 +53,50 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(
             len(response.context['page_obj']), settings.AMOUNT_POSTS
         )
+
+    def test_second_page_contains_four_posts(self):
+        """Вторая страница открывается по курсору из первой."""
+        response = self.client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(
+            reverse('posts:index'), {'after': cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 4)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+    def test_previous_cursor_returns_first_page(self):
+        """Курсор назад со второй страницы ведет на первую."""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        second = self.client.get(
+            reverse('posts:index'), {'after': first.next_cursor}
+        ).context['page_obj']
+        response = self.client.get(
+            reverse('posts:index'), {'before': second.previous_cursor})
+        self.assertEqual(
+            list(response.context['page_obj']), list(first))
+
+    def test_legacy_page_redirects_to_cursor(self):
+        """Старая ссылка ?page=N перенаправляется на курсор."""
+        first = self.client.get(reverse('posts:index')).context['page_obj']
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertRedirects(
+            response,
+            reverse('posts:index') + f'?after={first.next_cursor}')
+        response = self.client.get(reverse('posts:index'), {'page': 1})
+        self.assertRedirects(response, reverse('posts:index'))
+
+    def test_broken_cursor_shows_first_page(self):
+        response = self.client.get(reverse('posts:index'), {'after': '%%%'})
+        self.assertEqual(
+            len(response.context['page_obj']), settings.AMOUNT_POSTS)
+
+    def test_pagination_does_not_count(self):
+        """Пагинатор не выполняет COUNT(*) и OFFSET."""
+        response = self.client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'), {'after': cursor})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(*)', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
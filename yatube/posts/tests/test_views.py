@@ -1,16 +1,21 @@
+import hashlib
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Group, Post
+from core.storage import ContentAddressedStorage
+
+from ..models import Comment, Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -36,6 +41,9 @@ class PostPagesTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        # Все три картинки одинаковые и хранятся одним файлом.
+        cls.image_name = ContentAddressedStorage.hashed_name(
+            'posts', hashlib.sha256(cls.small_gif).hexdigest(), '.gif')
         cls.uploaded = SimpleUploadedFile(
             name='small.gif',
             content=cls.small_gif,
@@ -142,7 +150,7 @@ class PostPagesTests(TestCase):
             (f'{post.text}', post_same.text),
             (f'{post.author}', str(post_same.author)),
             (f'{post.group}', str(post_same.group)),
-            ('posts/small.gif', str(post_same.image)),
+            (PostPagesTests.image_name, str(post_same.image)),
         )
         for post_fields, post_same_fields in post_info:
             with self.subTest():
@@ -167,7 +175,7 @@ class PostPagesTests(TestCase):
         info = (
             (group, response.context['group']),
             (post.group, response.context['group']),
-            ('posts/small2.gif', str(post.image)),
+            (PostPagesTests.image_name, str(post.image)),
         )
         for fixture_info, comtext_info in info:
             with self.subTest():
@@ -191,7 +199,7 @@ class PostPagesTests(TestCase):
         self.assertIsInstance(response.context['page_obj'], Page)
         self.assertIn('posts', response.context)
         self.assertIn('posts_amount', response.context)
-        self.assertEqual(post_image, 'posts/small2.gif')
+        self.assertEqual(post_image, PostPagesTests.image_name)
         self.assertEqual(author.username, str(response.context['author']))
         self.assertNotEqual(PostPagesTests.user2,
                             first_object.author)
@@ -209,7 +217,7 @@ class PostPagesTests(TestCase):
         self.assertIn('title', response.context)
         self.assertEqual(post, response.context['post'])
         self.assertEqual(post.text, str(response.context['post']))
-        self.assertEqual(post.image, 'posts/small3.gif')
+        self.assertEqual(post.image, PostPagesTests.image_name)
 
     def test_post_edit_post_show_correct_context(self):
         """Шаблон create_post для редактирования поста сформирован
@@ -247,19 +255,148 @@ class PostPagesTests(TestCase):
         cache.clear()
         # делаем первый запрос
         self.authorized_client.get(reverse('posts:index'))
-        # создаем пост
-        new_post = Post.objects.create(text="тестируем кэш",
-                                       author=PostPagesTests.user)
+        # меняем текст в обход сигналов: версия ленты не меняется
+        Post.objects.filter(pk=PostPagesTests.post_user2.pk).update(
+            text='текст мимо кэша')
         # делаем второй запрос
         response2 = self.authorized_client.get(reverse('posts:index'))
-        # пост не должен появиться во втором запросе
-        self.assertNotIn(new_post.text, response2.content.decode())
-        # очищаем кэш
-        cache.clear()
+        # фрагмент взят из кэша, нового текста в нем нет
+        self.assertNotIn('текст мимо кэша', response2.content.decode())
+        # создаем пост: сигнал меняет версию главной страницы
+        new_post = Post.objects.create(text="тестируем кэш",
+                                       author=PostPagesTests.user)
         # делаем третий запрос
         response3 = self.authorized_client.get(reverse('posts:index'))
         # проверяем, что пост есть в третьем запросе
         self.assertIn(new_post.text, response3.content.decode())
+        self.assertIn('текст мимо кэша', response3.content.decode())
+
+    def test_feed_cache_invalidates_only_affected_feeds(self):
+        """Новый пост сбрасывает кэш только своих лент."""
+        cache.clear()
+        group_url = reverse(
+            'posts:group_list', args=[PostPagesTests.group_for_user2.slug])
+        self.authorized_client.get(group_url)
+        Post.objects.filter(pk=PostPagesTests.post_user2.pk).update(
+            text='текст мимо кэша')
+        Post.objects.create(
+            text='пост в другой группе',
+            author=PostPagesTests.user,
+            group=PostPagesTests.group)
+        response = self.authorized_client.get(group_url)
+        self.assertNotIn('текст мимо кэша', response.content.decode())
+
+    def test_guest_page_cache_purged_by_signals(self):
+        """Страницы гостей кешируются целиком и сбрасываются сигналами."""
+        cache.clear()
+        post = PostPagesTests.post
+        detail_url = reverse('posts:post_detail', args=[post.pk])
+        group_url = reverse(
+            'posts:group_list', args=[PostPagesTests.group_for_user2.slug])
+        self.client.get(detail_url)
+        self.client.get(group_url)
+        Post.objects.filter(pk=post.pk).update(text='текст мимо кэша')
+        response = self.client.get(detail_url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, 'текст мимо кэша')
+        Comment.objects.create(
+            post=post, author=PostPagesTests.user2, text='Комментарий')
+        response = self.client.get(detail_url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'текст мимо кэша')
+        # Пост в другой группе не трогает страницу этой группы.
+        self.assertEqual(
+            self.client.get(group_url)['X-Page-Cache'], 'hit')
+
+    def test_guest_page_rebuilt_once(self):
+        """Пока один запрос перестраивает страницу, другие получают
+        прежнюю копию."""
+        cache.clear()
+        url = reverse('posts:index')
+        self.client.get(url)
+        new_post = Post.objects.create(
+            text='пост после сброса', author=PostPagesTests.user)
+        key = 'page:{}:lock'.format(hashlib.md5(url.encode()).hexdigest())
+        cache.add(key, 1)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotContains(response, new_post.text)
+        cache.delete(key)
+        self.assertContains(self.client.get(url), new_post.text)
+
+    def test_feed_versions_shared_between_processes(self):
+        """Изменение в другом процессе сразу сбрасывает страницу."""
+        cache.clear()
+        url = reverse('posts:index')
+        self.client.get(url)
+        other_process = LocMemCache('other-process', {})
+        with mock.patch('posts.cache.cache', other_process):
+            new_post = Post.objects.create(
+                text='пост из другого процесса', author=PostPagesTests.user)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, new_post.text)
+
+    def test_page_cache_skips_authorized_users(self):
+        """Пользователи всегда получают свежую страницу."""
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertIsNotNone(response.context)
+
+    def test_conditional_get_answers_not_modified(self):
+        """Страницы отвечают 304, пока их ленты не менялись."""
+        cache.clear()
+        # Сессия, пользователь и версии лент, плюс поиск группы, автора
+        # или поста.
+        budgets = (
+            (reverse('posts:index'), 3),
+            (reverse('posts:group_list',
+                     args=[PostPagesTests.group.slug]), 4),
+            (reverse('posts:profile',
+                     args=[PostPagesTests.user.username]), 4),
+            (reverse('posts:post_detail',
+                     args=[PostPagesTests.post.pk]), 4),
+            (reverse('posts:follow_index'), 3),
+        )
+        # Первая страница с формой выдает cookie CSRF, а ETag от него
+        # зависит.
+        self.authorized_client.get(budgets[-2][0])
+        for url, budget in budgets:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                with self.assertNumQueries(budget):
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        index_url = reverse('posts:index')
+        etag = self.authorized_client.get(index_url)['ETag']
+        Post.objects.create(text='новый пост', author=PostPagesTests.user)
+        response = self.authorized_client.get(
+            index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_reader(self):
+        """У разных читателей и после подписки ETag разный."""
+        cache.clear()
+        url = reverse('posts:profile', args=[PostPagesTests.user2.username])
+        etag = self.authorized_client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+        self.assertNotEqual(self.authorized_client3.get(url)['ETag'], etag)
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', args=[PostPagesTests.user2.username]))
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_csrf_cookie(self):
+        """После смены токена CSRF страница с формой комментария
+        отдается заново, а не из копии браузера."""
+        url = reverse('posts:post_detail', args=[PostPagesTests.post.pk])
+        etag = self.authorized_client.get(url)['ETag']
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'new'
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
 
     def test_authorizate_can_follow(self):
         """ Авторизованный пользователь может подписаться на автора """
@@ -0,0 +1,123 @@
+"""Прием картинок постов с ограничениями.
+
+LimitedUploadHandler перестает принимать байты файла, как только их
+больше IMAGE_UPLOAD_MAX_BYTES, поэтому огромная загрузка не занимает
+ни памяти, ни диска. Число пикселей проверяется по заголовку, до
+декодирования картинки. Слишком большие стороны уменьшаются до
+IMAGE_MAX_SIDE, а EXIF (координаты, модель камеры) удаляется.
+
+Память на одну загрузку: сам файл держится в памяти до
+FILE_UPLOAD_MAX_MEMORY_SIZE байт, больше уходит во временный файл.
+Перекодирование декодирует картинку целиком, это до 4 байт на пиксель,
+то есть не больше 4 * IMAGE_MAX_PIXELS байт; JPEG уменьшается еще при
+декодировании (draft) и занимает 4 байта на пиксель уже уменьшенной
+картинки. Результат пишется в SpooledTemporaryFile с тем же порогом.
+"""
+import tempfile
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+REENCODED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """Отбрасывает остаток файла сверх IMAGE_UPLOAD_MAX_BYTES.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS: пока файл в пределах лимита,
+    данные уходят следующим обработчикам, после — никуда. Вместо
+    обрезанного файла форма получает пустой файл с настоящим размером,
+    а validate() его отклоняет.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.IMAGE_UPLOAD_MAX_BYTES:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received <= settings.IMAGE_UPLOAD_MAX_BYTES:
+            return None
+        return UploadedFile(
+            file=tempfile.SpooledTemporaryFile(), name=self.file_name,
+            content_type=self.content_type, size=self.received,
+            charset=self.charset)
+
+
+def _spooled():
+    return tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+
+
+def _needs_reencoding(picture):
+    if picture.format not in REENCODED_FORMATS:
+        return False
+    Image.init()
+    if picture.format not in Image.SAVE or getattr(
+            picture, 'is_animated', False):
+        return False
+    side = settings.IMAGE_MAX_SIDE
+    return max(picture.size) > side or bool(picture.getexif())
+
+
+def normalize(upload):
+    """Уменьшает слишком большую картинку и удаляет EXIF.
+
+    Если менять нечего, возвращает исходный файл без перекодирования.
+    """
+    upload.seek(0)
+    with Image.open(upload) as picture:
+        if not _needs_reencoding(picture):
+            upload.seek(0)
+            return upload
+        image_format = picture.format
+        side = settings.IMAGE_MAX_SIDE
+        picture.draft(picture.mode, (side, side))
+        picture = ImageOps.exif_transpose(picture)
+        picture.thumbnail((side, side), Image.LANCZOS)
+        picture.info.pop('exif', None)
+        output = _spooled()
+        picture.save(
+            output, image_format, quality=settings.IMAGE_UPLOAD_QUALITY,
+            icc_profile=picture.info.get('icc_profile'))
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        file=output, name=upload.name, content_type=upload.content_type,
+        size=size, charset=upload.charset)
+
+
+def validate(upload):
+    """Проверяет размер файла и число пикселей по заголовку картинки."""
+    if upload.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise forms.ValidationError(
+            'Файл больше %(limit)s.', code='too_large',
+            params={'limit': filesizeformat(
+                settings.IMAGE_UPLOAD_MAX_BYTES)})
+    limit = settings.IMAGE_MAX_PIXELS
+    error = forms.ValidationError(
+        'Картинка больше %(limit)s мегапикселей.', code='too_many_pixels',
+        params={'limit': f'{limit / 1000000:g}'})
+    upload.seek(0)
+    try:
+        # Image.open читает только заголовок.
+        with Image.open(upload) as picture:
+            width, height = picture.size
+    except Image.DecompressionBombError:
+        raise error
+    except Exception:
+        # Не картинка: об этом уже сообщил ImageField.
+        return
+    finally:
+        upload.seek(0)
+    if width * height > limit:
+        raise error
@@ -13,6 +13,8 @@ urlpatterns = [
          views.profile_follow,
          name='profile_follow'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/events/', views.follow_events, name='follow_events'),
+    path('events/', views.index_events, name='index_events'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('posts/<int:post_id>/delete/',
@@ -22,5 +24,6 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('search/', views.search, name='search'),
     path('', views.index, name='index'),
 ]
@@ -1,8 +1,203 @@
+import base64
+import binascii
+from functools import wraps
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
+from django.shortcuts import redirect
+from django.utils.dateparse import parse_datetime
+
+AFTER = 'after'
+BEFORE = 'before'
+
+
+class LegacyPageRedirect(Exception):
+    """Запрос со старым параметром ?page=N нужно перенаправить на курсор."""
+
+    def __init__(self, url):
+        super().__init__(url)
+        self.url = url
+
+
+def encode_cursor(date, pk):
+    raw = f'{date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (дата, id) или None, если курсор испорчен."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Страница ищется условием по индексу от граничной записи предыдущей
+    страницы, поэтому время ответа не зависит от глубины страницы.
+    Номер страницы условный: 1 для первой страницы, 2 для любой другой.
+    Он нужен только для того, чтобы has_next()/has_previous() у Page
+    работали без подсчета записей.
+    """
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk'),
+                 resolve=None):
+        super().__init__(object_list, per_page)
+        self.date_key, self.id_key = keys
+        self.resolve = resolve
+        self.num_pages = 1
+
+    def encode(self, key):
+        return encode_cursor(*key)
+
+    def decode(self, token):
+        return decode_cursor(token)
+
+    @property
+    def ordered(self):
+        return self.object_list.order_by(
+            f'-{self.date_key}', f'-{self.id_key}')
 
+    def _seek(self, cursor, direction):
+        date, pk = cursor
+        if direction == AFTER:
+            return self.ordered.filter(
+                **{f'{self.date_key}__lte': date}
+            ).exclude(
+                **{self.date_key: date, f'{self.id_key}__gte': pk})
+        return self.object_list.filter(
+            **{f'{self.date_key}__gte': date}
+        ).exclude(
+            **{self.date_key: date, f'{self.id_key}__lte': pk}
+        ).order_by(self.date_key, self.id_key)
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, settings.AMOUNT_POSTS)
+    def fetch(self, cursor, direction, limit):
+        """Пары (ключ, объект) в порядке обхода от курсора.
+
+        resolve получает список строк и возвращает список объектов
+        для страницы той же длины (None для пропавших объектов).
+        """
+        if cursor is None:
+            rows = list(self.ordered[:limit])
+        else:
+            rows = list(self._seek(cursor, direction)[:limit])
+        objects = self.resolve(rows) if self.resolve else rows
+        return [
+            ((getattr(row, self.date_key), getattr(row, self.id_key)), obj)
+            for row, obj in zip(rows, objects)
+            if obj is not None
+        ]
+
+    def cursor_page(self, cursor=None, direction=AFTER):
+        limit = self.per_page + 1
+        if cursor is None:
+            rows = self.fetch(None, AFTER, limit)
+            has_previous = False
+            has_next = len(rows) > self.per_page
+        elif direction == AFTER:
+            rows = self.fetch(cursor, AFTER, limit)
+            has_previous = True
+            has_next = len(rows) > self.per_page
+        else:
+            rows = self.fetch(cursor, BEFORE, limit)
+            if len(rows) <= self.per_page:
+                # Перед курсором меньше страницы: это уже начало ленты.
+                return self.cursor_page()
+            rows.reverse()
+            rows = rows[1:]
+            has_previous = True
+            has_next = True
+        rows = rows[:self.per_page]
+        number = 2 if has_previous else 1
+        self.num_pages = number + (1 if has_next else 0)
+        page = Page([obj for key, obj in rows], number, self)
+        page.next_cursor = self.encode(rows[-1][0]) if has_next else None
+        page.previous_cursor = (
+            self.encode(rows[0][0]) if has_previous else None)
+        return page
+
+    def legacy_cursor(self, number):
+        """Курсор для старой ссылки ?page=N (один запрос с OFFSET)."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return None
+        if number <= 1:
+            return None
+        boundary = self.ordered.values_list(
+            self.date_key, self.id_key
+        )[(number - 1) * self.per_page - 1:][:1]
+        boundary = list(boundary)
+        if not boundary:
+            return None
+        return encode_cursor(*boundary[0])
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация по нескольким источникам с общим ключом.
+
+    Каждый источник отдает не больше страницы от курсора, результаты
+    сливаются по ключу, дубликаты по id отбрасываются.
+    """
+
+    def __init__(self, sources, per_page):
+        self.sources = sources
+        super().__init__([], per_page)
+
+    def fetch(self, cursor, direction, limit):
+        rows = {}
+        for source in self.sources:
+            for key, obj in source.fetch(cursor, direction, limit):
+                rows.setdefault(key[1], (key, obj))
+        return sorted(
+            rows.values(),
+            key=lambda row: row[0],
+            reverse=direction == AFTER,
+        )[:limit]
+
+    def legacy_cursor(self, number):
+        return None
+
+
+def paginate(request, paginator):
+    """Страница курсорного пагинатора по параметрам запроса."""
     page_number = request.GET.get('page')
-    return (paginator.get_page(page_number))
+    if page_number is not None:
+        params = request.GET.copy()
+        del params['page']
+        cursor = paginator.legacy_cursor(page_number)
+        if cursor:
+            params[AFTER] = cursor
+        query = params.urlencode()
+        raise LegacyPageRedirect(
+            f'{request.path}?{query}' if query else request.path)
+    before = paginator.decode(request.GET.get(BEFORE))
+    if before is not None:
+        return paginator.cursor_page(before, BEFORE)
+    return paginator.cursor_page(paginator.decode(request.GET.get(AFTER)))
+
+
+def paginator(request, post_list, keys=('pub_date', 'pk')):
+    return paginate(
+        request, CursorPaginator(post_list, settings.AMOUNT_POSTS, keys))
+
+
+def cursor_paginated(view):
+    """Перенаправляет старые ссылки ?page=N на курсорную пагинацию."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except LegacyPageRedirect as legacy:
+            return redirect(legacy.url)
+    return wrapper
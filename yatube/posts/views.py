@@ -2,56 +2,111 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import condition
 from django.views.generic.edit import DeleteView
 
+from . import events, renditions
+from .cache import (INDEX, PULLED, anonymous_page, feed_cache, feed_etag,
+                    follow_feed, group_feed, post_feed, profile_feed)
+from .counters import posts_amount
+from .feed import follow_paginator
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
-from .utils import paginator
+from .search import search_paginator
+from .utils import cursor_paginated, paginate, paginator
 
 
+def _group_feeds(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    return None if group_id is None else [group_feed(group_id)]
+
+
+def _profile_feeds(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок читателя.
+        return [profile_feed(author_id), follow_feed(request.user.pk)]
+    return [profile_feed(author_id)]
+
+
+def _post_feeds(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id').first()
+    if post is None:
+        return None
+    feeds = [post_feed(post_id), profile_feed(post['author_id'])]
+    if post['group_id']:
+        feeds.append(group_feed(post['group_id']))
+    return feeds
+
+
+def _index_feeds(request):
+    return [INDEX]
+
+
+def _follow_feeds(request):
+    return [follow_feed(request.user.pk), PULLED]
+
+
+@condition(etag_func=feed_etag(_index_feeds))
+@anonymous_page(_index_feeds)
+@cursor_paginated
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     page_obj = paginator(request, post_list)
     context = {
         'page_obj': page_obj,
+        **feed_cache(request, INDEX),
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=feed_etag(_group_feeds))
+@anonymous_page(_group_feeds)
+@cursor_paginated
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = group.posts.for_feed()
     page_obj = paginator(request, post_list)
     context = {
-        'group': get_object_or_404(Group, slug=slug),
-        'page_obj': page_obj, }
+        'group': group,
+        'page_obj': page_obj,
+        **feed_cache(request, group_feed(group.pk)),
+    }
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=feed_etag(_profile_feeds))
+@anonymous_page(_profile_feeds)
+@cursor_paginated
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    post_list = author.posts.for_feed()
     page_obj = paginator(request, post_list)
-    posts_amount = author.posts.count()
-    following_list = Follow.objects.filter(
-        user=request.user.id, author=author.id).all()
-    if len(following_list) > 0:
-        following = True
-    else:
-        following = False
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author).exists()
     context = {
         'author': author,
         'page_obj': page_obj,
         'posts': post_list,
-        'posts_amount': posts_amount,
+        'posts_amount': posts_amount(author),
         'following': following,
+        **feed_cache(request, profile_feed(author.pk)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=feed_etag(_post_feeds))
+@anonymous_page(_post_feeds)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
+    comments = post.comments.select_related('author')
     if request.method == "POST":
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -62,7 +117,7 @@ def post_detail(request, post_id):
         form = CommentForm()
     context = {
         'post': post,
-        'posts_amount': post.author.posts.count(),
+        'posts_amount': posts_amount(post.author),
         'title': post.text[:settings.POST_TEXT_SHORT],
         'form': form,
         'comments': comments,
@@ -71,6 +126,16 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@cursor_paginated
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'page_obj': paginate(request, search_paginator(query)),
+        'search_query': query,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method == 'POST':
@@ -80,7 +145,7 @@ def post_create(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            post.save()
+            renditions.save(post, form.changed_data)
             return redirect('posts:profile', post.author.username)
     else:
         form = PostForm()
@@ -102,7 +167,7 @@ def post_edit(request, post_id):
             instance=post)
         if form.is_valid():
             post = form.save(commit=False)
-            post.save()
+            renditions.save(post, form.changed_data)
             return redirect('posts:post_detail', post.id)
     else:
         form = PostForm(instance=post)
@@ -132,16 +197,43 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=feed_etag(_follow_feeds))
+@cursor_paginated
 def follow_index(request):
-    follows = Follow.objects.filter(user=request.user)
-    post_list = Post.objects.filter(author__in=follows.values('author'))
-    page_obj = paginator(request, post_list)
+    page_obj = paginate(request, follow_paginator(request.user))
     context = {
         'page_obj': page_obj,
+        **feed_cache(request, *_follow_feeds(request)),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def _since(request):
+    """id самого нового поста загруженной страницы."""
+    try:
+        return int(request.GET['since'])
+    except (KeyError, ValueError):
+        return Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+
+def index_events(request):
+    since = _since(request)
+    return events.stream_response(
+        [INDEX], lambda: Post.objects.filter(pk__gt=since).count())
+
+
+@login_required
+def follow_events(request):
+    since = _since(request)
+    authors = list(Follow.objects.filter(
+        user=request.user).values_list('author_id', flat=True))
+    return events.stream_response(
+        [profile_feed(author_id) for author_id in authors],
+        lambda: Post.objects.filter(
+            author_id__in=authors, pk__gt=since).count())
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.jobs import job
+
+User = get_user_model()
+
+
+@job(priority=10)
+def send_password_reset(user_id, domain, site_name, use_https, templates,
+                        from_email=None, extra_email_context=None):
+    """Письмо со ссылкой сброса пароля.
+
+    Токен создается здесь, а не в запросе: в очереди лежат только id
+    пользователя и адрес сайта. Токен привязан к паролю и времени
+    последнего входа, так что ссылка та же, что выдал бы запрос.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+    email = getattr(user, User.get_email_field_name())
+    context = {
+        'email': email,
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+        **(extra_email_context or {}),
+    }
+    PasswordResetForm().send_mail(
+        templates['subject'], templates['email'], context, from_email,
+        email, html_email_template_name=templates.get('html'))
@@ -1,10 +1,16 @@
+import re
 from http import HTTPStatus
+from io import StringIO
 
 from django import forms
+from django.core import mail
+from django.core.management import call_command
 from django.test import Client, TestCase
 from django.urls import reverse
 from posts.models import User
 
+from core.models import Job
+
 
 class AboutTests(TestCase):
     def setUp(self):
@@ -92,3 +98,27 @@ class AboutTests(TestCase):
         )
         self.assertRedirects(response, reverse(
             'posts:index'))
+
+
+class PasswordResetMailTests(TestCase):
+    def test_reset_mail_sent_from_queue(self):
+        """Письмо сброса пароля ставится в очередь и уходит из воркера."""
+        User.objects.create_user(
+            'TestReset', 'reset@example.com', 'password')
+        Client().post(
+            reverse('users:password_reset'), {'email': 'reset@example.com'})
+        self.assertEqual(mail.outbox, [])
+        queued = Job.objects.get()
+        self.assertEqual(queued.name, 'users.jobs.send_password_reset')
+        # Ни ссылки с токеном, ни адреса в таблице задач.
+        self.assertNotIn('/reset/', queued.payload)
+        self.assertNotIn('reset@example.com', queued.payload)
+        call_command('run_workers', once=True, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reset@example.com'])
+        self.assertFalse(Job.objects.exists())
+        link = re.search(r'http://testserver(/auth/reset/\S+)',
+                         mail.outbox[0].body).group(1)
+        response = Client().get(link)
+        self.assertRedirects(
+            response, link.rsplit('/', 2)[0] + '/set-password/')
@@ -1,5 +1,6 @@
 
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -25,10 +26,12 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,9 +67,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
 
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,6 +110,13 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# Сколько браузер хранит статику с хешем в имени.
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
 AMOUNT_POSTS = 10
 
 POST_TEXT_SHORT = 15
@@ -119,6 +139,99 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.LocMemCache',
     }
 }
+
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+
+FEED_BACKFILL_LIMIT = 1000
+
+FEED_BATCH_SIZE = 500
+
+FEED_CACHE_TIMEOUT = 60 * 60
+
+# Страницы целиком для гостей; сбрасываются сменой версий лент.
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Сколько ждать, пока один запрос перестроит страницу, прежде чем
+# перестраивать ее снова.
+PAGE_CACHE_LOCK_TIMEOUT = 30
+
+POST_RENDITIONS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# Очередь фоновых задач (core.jobs): задержка перед повтором упавшей
+# задачи в секундах (удваивается с каждой попыткой), через сколько
+# секунд задачу пропавшего воркера можно забрать и как часто воркер
+# проверяет пустую очередь.
+JOBS_RUN_INLINE = False
+
+JOBS_BACKOFF = 10
+
+JOBS_LOCK_TIMEOUT = 60 * 10
+
+JOBS_POLL_INTERVAL = 1
+
+# Потоки уведомлений о новых постах (posts.events): каждый занимает
+# поток сервера на все время. Под yatube.asgi это поток пула
+# ASGI_STREAM_THREADS, под WSGI-сервером — его рабочий поток, и предел
+# должен оставлять запас потоков для обычных страниц.
+SSE_MAX_STREAMS = 50
+
+SSE_HEARTBEAT = 15
+
+SSE_STREAM_TIMEOUT = 60 * 5
+
+SSE_RETRY_MS = 5000
+
+# Сколько запросов ASGI-вход (yatube.asgi) выполняет одновременно.
+ASGI_THREADS = 8
+
+# Потоки ASGI-входа для отдачи потоковых ответов: все SSE-потоки
+# и запас для файлов статики и медиа.
+ASGI_STREAM_THREADS = SSE_MAX_STREAMS + 16
+
+RENDITION_CACHE_TIMEOUT = 60 * 60 * 24
+
+RESPONSIVE_ASPECT = (960, 339)
+
+RESPONSIVE_WIDTHS = (320, 640, 960)
+
+# AVIF и WebP строятся, только если их поддерживает установленный Pillow.
+RESPONSIVE_FORMATS = ('AVIF', 'WEBP')
+
+RESPONSIVE_QUALITY = {'AVIF': 50, 'WEBP': 75, 'JPEG': 80}
+
+# Удалять файл картинки сразу, когда его перестает использовать последний
+# пост. Без этого осиротевшие файлы убирает manage.py gc_media.
+MEDIA_DELETE_ON_RELEASE = False
+
+# Файлы моложе стольких секунд не удаляются ни сразу, ни gc_media: загрузка
+# того же содержимого могла взять файл, но еще не закоммитить свой пост.
+MEDIA_GC_GRACE = 60 * 60
+
+# Загрузки сверх лимита отбрасываются, не дочитываясь до конца.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+IMAGE_MAX_SIDE = 2560
+
+IMAGE_UPLOAD_QUALITY = 90
+
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube-metrics')
+
+# Тесты пишут метрики во временный каталог, а не в METRICS_DIR.
+TEST_RUNNER = 'core.runner.TestRunner'
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
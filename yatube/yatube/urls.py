@@ -2,13 +2,19 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import metrics, serve_static
 
 urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics, name='metrics'),
+    re_path(r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+            serve_static, name='static'),
     path('', include('posts.urls', namespace='posts'))
 ]
 